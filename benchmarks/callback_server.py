@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Compare the builtin and the Flask callback servers: the time it takes to
+import and start them (what they add to the editor startup), and the latency
+of a '/status/breakpoint' callback.
+
+Usage:
+    python benchmarks/callback_server.py [--callbacks N]
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import subprocess
+import sys
+import time
+
+import requests
+
+from pyvim.callback_server import create_callback_server
+
+STARTUP_SCRIPT = '''
+import time
+start = time.time()
+from pyvim.callback_server import create_callback_server
+server = create_callback_server(%r, lambda stmt_id: None, port=0)
+server.start()
+print(time.time() - start)
+server.stop()
+'''
+
+
+def startup_time(name):
+    " Import and start the server in a fresh interpreter. "
+    output = subprocess.check_output(
+        [sys.executable, '-c', STARTUP_SCRIPT % name])
+    return float(output)
+
+
+def callback_latencies(name, count):
+    server = create_callback_server(name, lambda stmt_id: None,
+                                    host='127.0.0.1', port=0)
+    server.start()
+    try:
+        session = requests.Session()
+        url = 'http://127.0.0.1:%i/status/breakpoint' % server.server_port
+        session.post(url, data='0')  # Warm up.
+
+        result = []
+        for i in range(count):
+            start = time.time()
+            session.post(url, data=str(i))
+            result.append(time.time() - start)
+        return sorted(result)
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--callbacks', type=int, default=1000)
+    args = parser.parse_args()
+
+    for name in ('builtin', 'flask'):
+        startup = min(startup_time(name) for _ in range(3))
+        latencies = callback_latencies(name, args.callbacks)
+        print('%-8s startup %7.1f ms   callback p50 %6.3f ms  p99 %6.3f ms' % (
+            name, startup * 1000,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * .99)] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Lookup latency on a large generated debug database.
+
+Generates a database with `--statements` statements, each with `--variables`
+variables (reused when the file already exists), and compares the plain
+read-write connection with the read-only, immutable, memory-mapped one, in
+lazy mode: every lookup of a new statement runs SQL.
+
+The defaults give a database of about 150 MB. For a multi-GB database, use
+e.g. ``--statements 2000000 --variables 40``.
+
+Usage:
+    python benchmarks/debug_database.py [--database FILE] [--statements N]
+        [--variables N] [--lookups N] [--threads N] [--no-index]
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from pyvim.debug_database import DebugDatabase
+
+
+def generate(filename, statements, variables, index):
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE breakpoint (id INTEGER, filename TEXT, '
+                 'line_num INTEGER)')
+    conn.execute('CREATE TABLE variable (handle TEXT, var TEXT, '
+                 'front_var TEXT, id INTEGER)')
+
+    def breakpoints():
+        for i in range(statements):
+            yield i, '/src/module_%04i.py' % (i // 1000), i % 1000 + 1
+
+    def rows():
+        for i in range(statements):
+            for j in range(variables):
+                yield ('mod_%i.inst_%i' % (i // 1000, j % 8),
+                       'signal_%i' % j, 'self.signal_%i' % j, i)
+
+    conn.executemany('INSERT INTO breakpoint VALUES (?, ?, ?)', breakpoints())
+    conn.executemany('INSERT INTO variable VALUES (?, ?, ?, ?)', rows())
+    if index:
+        conn.execute('CREATE INDEX breakpoint_id ON breakpoint (id)')
+        conn.execute('CREATE INDEX breakpoint_filename ON breakpoint '
+                     '(filename, line_num)')
+        conn.execute('CREATE INDEX variable_id ON variable (id)')
+    conn.commit()
+    conn.close()
+
+
+def lookups(db, stmt_ids, latencies):
+    for stmt_id in stmt_ids:
+        start = time.time()
+        db.location(stmt_id)
+        db.variables(stmt_id)
+        latencies.append(time.time() - start)
+
+
+def measure(filename, read_only, stmt_ids, threads):
+    db = DebugDatabase(filename, lazy=True, read_only=read_only)
+    latencies = []
+    chunks = [stmt_ids[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=lookups, args=(db, chunk, latencies))
+               for chunk in chunks]
+    start = time.time()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    total = time.time() - start
+    db.close()
+
+    latencies.sort()
+    return (total, latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * .99)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database')
+    parser.add_argument('--statements', type=int, default=100000)
+    parser.add_argument('--variables', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--no-index', action='store_true')
+    args = parser.parse_args()
+
+    filename = args.database or os.path.join(
+        tempfile.gettempdir(), 'pyvim-bench-%i-%i%s.db' % (
+            args.statements, args.variables,
+            '-noindex' if args.no_index else ''))
+    if not os.path.exists(filename):
+        print('Generating %s...' % filename)
+        generate(filename, args.statements, args.variables,
+                 not args.no_index)
+    print('Database: %s (%.1f MB)' % (
+        filename, os.path.getsize(filename) / 1024. / 1024.))
+
+    stmt_ids = random.sample(range(args.statements),
+                             min(args.lookups, args.statements))
+
+    print('%-12s %10s %10s %10s' % ('mode', 'total s', 'p50 ms', 'p99 ms'))
+    for name, read_only in (('read-write', False), ('read-only', True)):
+        total, p50, p99 = measure(filename, read_only, stmt_ids, args.threads)
+        print('%-12s %10.3f %10.3f %10.3f' % (name, total, p50 * 1000,
+                                              p99 * 1000))
+
+
+if __name__ == '__main__':
+    main()
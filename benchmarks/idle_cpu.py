@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Measure the CPU time used by an idle editor.
+
+Every mode runs an editor, without any input, in a fresh interpreter:
+
+- ``legacy``: redraw every 0.3 seconds, like the old auto-refresh thread.
+- ``fallback``: the default, only redraw when something changed or the
+  terminal was resized, checked every 0.3 seconds.
+- ``off``: no periodic refresh at all (``:set refresh=0``).
+
+Usage:
+    python benchmarks/idle_cpu.py [--seconds N]
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import subprocess
+import sys
+
+IDLE_SCRIPT = '''
+import os, sqlite3, sys, tempfile, threading, time
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+from pyvim.editor import Editor
+
+mode, seconds = %r, %r
+directory = tempfile.mkdtemp()
+database = os.path.join(directory, 'debug.db')
+conn = sqlite3.connect(database)
+conn.execute('CREATE TABLE breakpoint (id, filename, line_num)')
+conn.execute('CREATE TABLE variable (handle, var, front_var, id)')
+conn.commit()
+conn.close()
+
+qt_app = QApplication(sys.argv)
+with create_pipe_input() as pipe_input:
+    editor = Editor(database, config_directory=directory, input=pipe_input,
+                    output=DummyOutput(),
+                    refresh_interval=0 if mode in ('legacy', 'off') else .3)
+    editor.load_initial_files([])
+    renders = [0]
+    def rendered(_):
+        renders[0] += 1
+    editor.application.after_render += rendered
+
+    if mode == 'legacy':
+        def refresh():
+            while True:
+                time.sleep(.3)
+                editor.application.invalidate()
+        t = threading.Thread(target=refresh)
+        t.daemon = True
+        t.start()
+
+    editor.run()
+    time.sleep(1)  # startup
+    renders[0] = 0
+    start = time.process_time()
+    time.sleep(seconds)
+    cpu = time.process_time() - start
+
+    app = editor.application
+    app.loop.call_soon_threadsafe(app.exit)
+    editor.thread.join()
+    editor.debugger.stop()
+    print(cpu, renders[0])
+'''
+
+
+def idle_cpu(mode, seconds):
+    output = subprocess.check_output(
+        [sys.executable, '-c', IDLE_SCRIPT % (mode, seconds)],
+        stderr=subprocess.DEVNULL)
+    cpu, renders = output.split()[-2:]
+    return float(cpu), int(renders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print('%-10s %12s %10s' % ('mode', 'cpu % idle', 'renders'))
+    for mode in ('legacy', 'fallback', 'off'):
+        cpu, renders = idle_cpu(mode, args.seconds)
+        print('%-10s %12.2f %10i' % (mode, 100. * cpu / args.seconds, renders))
+
+
+if __name__ == '__main__':
+    main()
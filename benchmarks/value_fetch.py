@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Benchmark reading breakpoint values from the (stand-in) simulator, with and
+without the batched '/value/batch' protocol.
+
+Usage:
+    python benchmarks/value_fetch.py [--signals N] [--repeat N] [--latency S]
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import time
+
+from pyvim.fake_simulator import FakeSimulator
+from pyvim.simulator import SimulatorClient
+
+
+def bench(batch, handles, repeat, latency):
+    values = dict((h, i) for i, h in enumerate(handles))
+    sim = FakeSimulator(values, batch=batch, latency=latency).start()
+    try:
+        client = SimulatorClient('127.0.0.1', sim.port)
+        client.detect_capabilities()
+
+        start = time.time()
+        for _ in range(repeat):
+            client.get_values(handles)
+        elapsed = (time.time() - start) / repeat
+
+        stats = client.stats()
+        client.close()
+        return elapsed, stats
+    finally:
+        sim.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--signals', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+
+    handles = ['TOP.sig%i' % i for i in range(args.signals)]
+
+    for batch in (False, True):
+        elapsed, stats = bench(batch, handles, args.repeat, args.latency)
+        print('%-10s %8.2f ms/breakpoint  requests=%i connections=%i' % (
+            'batch' if batch else 'per-handle', elapsed * 1000,
+            stats['requests'], stats['connections']))
+
+
+if __name__ == '__main__':
+    main()
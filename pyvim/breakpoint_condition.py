@@ -0,0 +1,177 @@
+"""
+Conditions for breakpoints. (``:b <line> if <expression>``)
+
+The expression is a Python expression over the design variables that are
+visible at the statement, for instance ``count > 3 and self.valid``. It's
+parsed and compiled once into a predicate. Every variable reference is
+replaced by a lookup in the list of values, so that evaluating the
+condition only needs the values of `BreakpointCondition.handles`, which can
+be read from the simulator in one batch.
+
+Only arithmetic, comparisons, boolean logic and constants are allowed. A
+condition shouldn't be able to block the debugger on every hit, so there is
+no ``**``, and ``<<`` and ``*`` refuse to build huge numbers or strings (like
+``count << 99999999999``).
+"""
+from __future__ import unicode_literals
+
+import ast
+import re
+
+__all__ = (
+    'BreakpointCondition',
+    'to_number',
+)
+
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare,
+    ast.IfExp, ast.Constant, ast.Name, ast.Attribute, ast.Load,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.UAdd, ast.USub,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.LShift, ast.RShift, ast.BitOr, ast.BitXor, ast.BitAnd,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Verilog style literals, like 8'hff or 'b1010.
+_SIZED_LITERAL = re.compile(r"^\d*'[sS]?([bBoOdDhH])([0-9a-fA-F_]+)$")
+_BASES = {'b': 2, 'o': 8, 'd': 10, 'h': 16}
+
+# Limits for the results of `<<` and `*`.
+MAX_BITS = 4096
+MAX_LENGTH = 4096
+
+
+def _bits(value):
+    return value.bit_length() if isinstance(value, int) else 0
+
+
+def _lshift(a, b):
+    if isinstance(b, int) and _bits(a) + b > MAX_BITS:
+        raise ValueError('Shift too large: %s << %s' % (a, b))
+    return a << b
+
+
+def _mult(a, b):
+    for x, y in ((a, b), (b, a)):
+        if isinstance(x, str) and isinstance(y, int) and \
+                len(x) * y > MAX_LENGTH:
+            raise ValueError('String too long: %r * %s' % (x, y))
+    if _bits(a) + _bits(b) > MAX_BITS:
+        raise ValueError('Product too large')
+    return a * b
+
+
+_CHECKED_OPERATORS = {ast.LShift: '_lshift', ast.Mult: '_mult'}
+
+
+def to_number(value):
+    """
+    Convert a value, as returned by the simulator, to a number when possible.
+    """
+    try:
+        return int(value, 0)
+    except ValueError:
+        pass
+    m = _SIZED_LITERAL.match(value)
+    if m:
+        return int(m.group(2).replace('_', ''), _BASES[m.group(1).lower()])
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _dotted_name(node):
+    " Return 'a.b.c' for a Name/Attribute chain, or None. "
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return '.'.join(reversed(parts))
+
+
+class _VariableReplacer(ast.NodeTransformer):
+    """
+    Replace every variable by ``_v[<index>]``.
+    """
+    def __init__(self, variables):
+        self.variables = variables
+        self.handles = []
+
+    def _replace(self, node):
+        name = _dotted_name(node)
+        if name is None:
+            raise ValueError('Unsupported expression')
+        if name not in self.variables:
+            raise ValueError('Unknown variable: %s' % name)
+
+        handle = self.variables[name]
+        if handle not in self.handles:
+            self.handles.append(handle)
+        index = self.handles.index(handle)
+
+        return ast.copy_location(ast.Subscript(
+            value=ast.Name(id='_v', ctx=ast.Load()),
+            slice=ast.Constant(value=index),
+            ctx=ast.Load()), node)
+
+    visit_Name = _replace
+    visit_Attribute = _replace
+
+    def visit_BinOp(self, node):
+        " Replace `<<` and `*` by calls to the functions that check them. "
+        node = self.generic_visit(node)
+        function = _CHECKED_OPERATORS.get(type(node.op))
+        if function is None:
+            return node
+        return ast.copy_location(ast.Call(
+            func=ast.Name(id=function, ctx=ast.Load()),
+            args=[node.left, node.right], keywords=[]), node)
+
+
+class BreakpointCondition(object):
+    """
+    Compiled breakpoint condition.
+
+    :param expression: The condition, as typed by the user.
+    :param variables: Dictionary mapping the front-end variable names to the
+        simulator handles.
+
+    Raises `ValueError` (or `SyntaxError`) for invalid expressions.
+    """
+    def __init__(self, expression, variables):
+        self.expression = expression
+
+        tree = ast.parse(expression.strip(), mode='eval')
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError('Not allowed in a condition: %s' %
+                                 node.__class__.__name__)
+
+        replacer = _VariableReplacer(variables)
+        tree = ast.fix_missing_locations(replacer.visit(tree))
+
+        #: The handles of which the values are needed, in order.
+        self.handles = tuple(replacer.handles)
+
+        #: Mapping of the used variable names to their handles.
+        self.variables = dict((name, handle) for name, handle
+                              in variables.items() if handle in self.handles)
+
+        self._code = compile(tree, '<condition>', 'eval')
+
+    def evaluate(self, values):
+        """
+        Evaluate the condition for these values. (One value for each of the
+        handles in `self.handles`.) Raises an exception when the evaluation
+        fails.
+        """
+        v = [to_number(value) for value in values]
+        return bool(eval(self._code, {'__builtins__': {}},
+                         {'_v': v, '_lshift': _lshift, '_mult': _mult}))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.expression)
@@ -0,0 +1,160 @@
+"""
+HTTP listener for the callbacks of the simulator.
+
+When the simulator stops on a breakpoint, it sends ``POST /status/breakpoint``
+with the stmt id as body, and expects a ``200 Okay`` answer. Two
+implementations of this listener are available:
+
+- ``'builtin'``: a small `http.server` based server. (Default.)
+- ``'flask'``: the original Flask application. (Requires Flask.)
+
+Usage::
+
+    server = create_callback_server('builtin', on_breakpoint, port=8889)
+    server.start()
+    ...
+    server.stop()
+"""
+from __future__ import unicode_literals
+
+from abc import ABCMeta, abstractmethod
+import logging
+import six
+import threading
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+__all__ = (
+    'CALLBACK_SERVERS',
+    'BuiltinCallbackServer',
+    'FlaskCallbackServer',
+    'create_callback_server',
+)
+
+
+class _CallbackServer(six.with_metaclass(ABCMeta, object)):
+    """
+    Base class for the callback listeners.
+
+    :param on_breakpoint: Callable that receives the stmt id (an integer) of
+        every breakpoint hit. It's called from the server thread.
+    """
+    def __init__(self, on_breakpoint, host='0.0.0.0', port=8889):
+        self.on_breakpoint = on_breakpoint
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @abstractmethod
+    def _create_server(self):
+        " Return an object with `serve_forever` and `shutdown` methods. "
+
+    def start(self):
+        self._server = self._create_server()
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def server_port(self):
+        " The port we're listening on. (Useful when `port` was 0.) "
+        return self._server.server_port
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _BreakpointRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length)
+
+        if self.path != '/status/breakpoint':
+            self._reply(404, 'Not Found')
+            return
+        try:
+            stmt_id = int(data)
+        except ValueError:
+            self._reply(400, 'Bad Request')
+            return
+
+        self.server.on_breakpoint(stmt_id)
+        self._reply(200, 'Okay')
+
+
+class BuiltinCallbackServer(_CallbackServer):
+    """
+    Callback listener on top of the standard library HTTP server.
+    """
+    def _create_server(self):
+        server = _ThreadingHTTPServer((self.host, self.port),
+                                      _BreakpointRequestHandler)
+        server.on_breakpoint = self.on_breakpoint
+        return server
+
+
+class FlaskCallbackServer(_CallbackServer):
+    """
+    Callback listener using Flask. (Flask is only imported when this server
+    is created.)
+    """
+    def _create_server(self):
+        from flask import Flask, request
+        from werkzeug.serving import make_server
+
+        # disable flask logging
+        log = logging.getLogger('werkzeug')
+        log.setLevel(logging.ERROR)
+
+        app = Flask(__name__)
+
+        @app.route("/status/breakpoint", methods=["POST"])
+        def hit_breakpoint():
+            id_ = request.get_data()
+            id_ = int(id_)
+            self.on_breakpoint(id_)
+            return "Okay", 200
+
+        return make_server(self.host, self.port, app, threaded=True)
+
+
+#: Mapping from option value to callback server class.
+CALLBACK_SERVERS = {
+    'builtin': BuiltinCallbackServer,
+    'flask': FlaskCallbackServer,
+}
+
+
+def create_callback_server(name, on_breakpoint, host='0.0.0.0', port=8889):
+    """
+    Create the callback server with this name. (See `CALLBACK_SERVERS`.)
+    """
+    try:
+        cls = CALLBACK_SERVERS[name]
+    except KeyError:
+        raise ValueError('Unknown callback server: %r' % (name, ))
+    return cls(on_breakpoint, host=host, port=port)
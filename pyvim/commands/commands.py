@@ -243,13 +243,36 @@ def _buffer(editor, variables, force=False):
 @_cmd('b')
 def _break_point(editor, variables):
     """
-    set breakpoint
-    """
-    line_num = variables.get("buffer_name")
-    if line_num:
+    set breakpoint, optionally with a condition: `:b <line> if <expr>`, or
+    on a range of lines: `:b <start>,<end>`
+    """
+    line_num = variables.get("line") or variables.get("buffer_name")
+    end_line = variables.get("end_line")
+    filename = editor.current_editor_buffer.location
+    if end_line:
+        # breakpoint all statements in the range
+        editor.debugger.set_break_points(filename, int(line_num),
+                                         int(end_line))
+    elif line_num:
         # breakpoint the line number
-        filename = editor.current_editor_buffer.location
-        editor.debugger.set_break_point(filename, line_num)
+        editor.debugger.set_break_point(filename, line_num,
+                                        condition=variables.get("condition"))
+
+
+@cmd("bfile")
+def _break_point_file(editor, force=False):
+    """
+    Set breakpoints on all statements of the current file.
+    """
+    editor.debugger.set_break_points(editor.current_editor_buffer.location)
+
+
+@cmd("bclear")
+def _break_point_clear(editor, force=False):
+    """
+    Remove all breakpoints.
+    """
+    editor.debugger.clear_break_points()
 
 
 @cmd("run")
@@ -263,6 +286,35 @@ def _continue(editor, force=False):
     editor.debugger.continue_()
 
 
+@_cmd('history')
+def _history(editor, variables):
+    """
+    Show an earlier hit of the current breakpoint.
+    """
+    hit = variables.get('hit')
+    other_hit = variables.get('other_hit')
+    editor.debugger.show_history(
+        int(hit) if hit else None,
+        int(other_hit) if other_hit else None)
+
+
+@location_cmd('debugstats')
+def debug_stats(editor, location):
+    """
+    Show the debugger metrics, or write them as JSON to a file.
+    """
+    if location:
+        try:
+            editor.debugger.dump_stats(os.path.expanduser(location))
+        except IOError as e:
+            editor.show_message('{}'.format(e))
+        else:
+            editor.show_message('Debugger stats written to %s' % location)
+    else:
+        editor.window_arrangement.hsplit(
+            text=editor.debugger.stats_report())
+
+
 @cmd('bw', accepts_force=True)
 @cmd('bd', accepts_force=True)
 def buffer_wipe(editor, force=False):
@@ -316,6 +368,7 @@ def quit(editor, all_=False, force=False):
         editor.show_message('%i more files to edit' % (len(ebs) - 1))
     else:
         editor.debugger.stop()
+        editor.reporter.shutdown()
         editor.application.exit()
 
 
@@ -532,6 +585,24 @@ def set_scroll_offset(editor, value):
             editor.show_message('Number required after =')
 
 
+@set_cmd('refresh', accepts_value=True)
+def set_refresh_interval(editor, value):
+    """
+    Set the interval of the periodic refresh, in seconds. (0 disables it.)
+    """
+    if value is None:
+        editor.show_message('refresh=%g' % editor.refresh_interval)
+    else:
+        try:
+            value = float(value)
+            if value >= 0:
+                editor.refresh_interval = value
+            else:
+                editor.show_message('Argument must be positive')
+        except ValueError:
+            editor.show_message('Number required after =')
+
+
 @set_cmd('incsearch')
 @set_cmd('is')
 def incsearch_enable(editor):
@@ -14,6 +14,12 @@ COMMAND_GRAMMAR = compile(r"""
         # Commands accepting a location.
         (?P<command>%(commands_taking_locations)s)(?P<force>!?)  \s+   (?P<location>[^\s]+)   |
 
+        # Breakpoints on a range of lines.
+        (?P<command>b) \s+ (?P<line>\d+) \s* , \s* (?P<end_line>\d+)   |
+
+        # Conditional breakpoint.
+        (?P<command>b) \s+ (?P<line>\d+) \s+ if \s+ (?P<condition>.+)    |
+
         # Commands accepting a buffer.
         (?P<command>b|buffer)(?P<force>!?)  \s+   (?P<buffer_name>[^\s]+)    |
 
@@ -30,6 +36,9 @@ COMMAND_GRAMMAR = compile(r"""
         # Shell command
         !(?P<shell_command>.*)                                  |
 
+        # Debugger value history
+        (?P<command>history) \s+ (?P<hit>\d+) (\s+ (?P<other_hit>\d+))?   |
+
         # Any other normal command.
         (?P<command>[^\s!]+)(?P<force>!?)                         |
 
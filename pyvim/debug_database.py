@@ -0,0 +1,459 @@
+"""
+In-memory index of the debug database.
+
+The debug database, produced by the compiler, has two tables:
+
+- ``breakpoint(id, filename, line_num)``: one row for every statement on
+  which the simulator can stop.
+- ``variable(<gen_handle>, <var>, <front_var>, id)``: the design variables
+  that are visible at each statement.
+
+These tables never change while the editor is running, so instead of running
+SQL for every lookup (some of them happen on every render), they are loaded
+once into dictionaries and sorted arrays.
+
+For the same reason, the file is opened read-only and immutable, which lets
+SQLite skip all locking, memory-map the file and keep its page cache. Every
+thread gets its own connection.
+
+In lazy mode, the queries in `HOT_QUERIES` run while debugging. At startup,
+their query plans are checked. When the compiler didn't create the indexes
+they need, an indexed copy of the database is built in a side-car cache
+directory (the input file is never modified), or, without cache directory, a
+warning about the full table scans is added to `DebugDatabase.warnings`.
+
+Usage::
+
+    db = DebugDatabase('debug.db')
+    stmt_id = db.stmt_id('/path/to/mod.py', 12)
+    for gen_handle, var, front_var in db.variables(stmt_id):
+        ...
+"""
+from __future__ import unicode_literals
+
+from array import array
+from bisect import bisect_left, bisect_right
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+
+from six.moves.urllib.request import pathname2url
+
+__all__ = (
+    'HOT_QUERIES',
+    'DebugDatabase',
+    'ResolvedHandleCache',
+)
+
+
+#: The queries that run while debugging (in lazy mode), with the table and
+#: columns of the index they need.
+HOT_QUERIES = {
+    'file_breakpoints': (
+        'SELECT line_num, id FROM breakpoint WHERE filename=?',
+        'breakpoint', ('filename', 'line_num')),
+    'location': (
+        'SELECT filename, line_num FROM breakpoint WHERE id=?',
+        'breakpoint', ('id', )),
+    'variables': (
+        'SELECT * FROM variable WHERE id=?',
+        'variable', ('id', )),
+}
+
+
+def _is_full_scan(detail):
+    " True for an `EXPLAIN QUERY PLAN` step that reads the whole table. "
+    return detail.startswith('SCAN') and 'INDEX' not in detail
+
+
+class DebugDatabase(object):
+    """
+    Read-only view on the debug database.
+
+    :param filename: Location of the SQLite database.
+    :param lazy: When `True`, don't load the whole database at startup, but
+        load (and remember) the rows of every file and statement the first
+        time they are requested. Useful for very large databases.
+    :param read_only: Open the database as an immutable, read-only file.
+        (Don't use this when the file can change while the editor runs.)
+    :param mmap_size: Number of bytes of the file that SQLite can memory-map.
+    :param cache_size: Size of the page cache of every connection, in KiB.
+    :param index_directory: Directory for the indexed copies of databases
+        that lack the indexes of `HOT_QUERIES`. (Lazy mode only.)
+    """
+    def __init__(self, filename, lazy=False, read_only=True,
+                 mmap_size=256 * 1024 * 1024, cache_size=16 * 1024,
+                 index_directory=None):
+        self.filename = os.path.abspath(filename)
+        # The file that is queried: `filename` or its indexed copy.
+        self.query_filename = self.filename
+        self.warnings = []
+        self.lazy = lazy
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+
+        # One connection per thread: the UI thread, the thread that handles
+        # breakpoint callbacks and the value fetchers query concurrently.
+        self._local = threading.local()
+        self._connections = []
+
+        # Protects the in-memory indexes while they are filled.
+        self._lock = threading.RLock()
+
+        # List of all files, in database order.
+        self._files = None
+
+        # Mapping from filename to a sorted array of breakpoint line numbers.
+        self._lines = {}
+
+        # Mapping from (filename, line) to the stmt id. The stmt id is `None`
+        # when several statements share this line.
+        self._stmt_ids = {}
+
+        # Mapping from filename to a (lines, stmt ids) tuple of two parallel
+        # arrays, sorted by line, with every statement of the file. (Used to
+        # resolve line ranges.)
+        self._file_stmts = {}
+
+        # Mapping from stmt id to (filename, line).
+        self._locations = {}
+
+        # Mapping from stmt id to a tuple of (gen_handle, var, front_var)
+        # tuples.
+        self._variables = {}
+
+        if lazy:
+            self._check_indexes(index_directory)
+        else:
+            self.load()
+
+    def _connect(self):
+        if self.read_only:
+            uri = 'file:%s?mode=ro&immutable=1' % pathname2url(
+                self.query_filename)
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.query_filename,
+                                   check_same_thread=False)
+        conn.execute('PRAGMA mmap_size=%i' % self.mmap_size)
+        conn.execute('PRAGMA cache_size=%i' % -self.cache_size)
+        return conn
+
+    @property
+    def conn(self):
+        " The SQLite connection of the current thread. "
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _query(self, query, args=()):
+        return self.conn.execute(query, args).fetchall()
+
+    def full_scans(self):
+        """
+        Return the names of the `HOT_QUERIES` for which SQLite would read a
+        whole table.
+        """
+        scans = []
+        for name, (query, _, _) in sorted(HOT_QUERIES.items()):
+            plan = self._query('EXPLAIN QUERY PLAN ' + query, (None, ))
+            if any(_is_full_scan(row[-1]) for row in plan):
+                scans.append(name)
+        return scans
+
+    def _check_indexes(self, index_directory):
+        scans = self.full_scans()
+        if scans and index_directory is not None:
+            try:
+                self.query_filename = self._build_index_cache(index_directory)
+            except (sqlite3.Error, OSError) as e:
+                self.warnings.append(
+                    'Unable to index the debug database: %s' % e)
+            else:
+                self.close()  # Reconnect to the indexed copy.
+                scans = self.full_scans()
+
+        if scans:
+            self.warnings.append(
+                'Debug database has no index for %s: full table scans' %
+                ', '.join(scans))
+
+    def _build_index_cache(self, directory):
+        """
+        Copy the database into `directory` and add the indexes. Returns the
+        filename of the copy. (Reused as long as the input doesn't change.)
+        """
+        st = os.stat(self.filename)
+        key = '%s:%s:%s' % (self.filename, st.st_size, st.st_mtime)
+        path = os.path.join(
+            directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.db')
+        if os.path.exists(path):
+            return path
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp_path = path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        # (Opened as URI, so that the source can be attached read-only.)
+        conn = sqlite3.connect('file:%s' % pathname2url(temp_path), uri=True)
+        try:
+            conn.execute('ATTACH DATABASE ? AS source', (
+                'file:%s?mode=ro' % pathname2url(self.filename), ))
+            for table in ('breakpoint', 'variable'):
+                conn.execute('CREATE TABLE %s AS SELECT * FROM source.%s' % (
+                    table, table))
+            for _, table, columns in HOT_QUERIES.values():
+                conn.execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)' % (
+                    table, '_'.join(columns), table, ', '.join(columns)))
+            conn.commit()
+        finally:
+            conn.close()
+        os.rename(temp_path, path)
+        return path
+
+    def load(self):
+        """
+        Load both tables in memory.
+        """
+        with self._lock:
+            files = []
+            stmts = {}
+
+            for stmt_id, filename, line in self._query(
+                    "SELECT id, filename, line_num FROM breakpoint"):
+                if filename not in stmts:
+                    files.append(filename)
+                    stmts[filename] = []
+                stmts[filename].append((line, stmt_id))
+                self._add_breakpoint(stmt_id, filename, line)
+
+            self._files = files
+            for filename, rows in stmts.items():
+                self._index_file(filename, rows)
+
+            variables = {}
+            for gen_handle, var, front_var, stmt_id in self._query(
+                    "SELECT * FROM variable"):
+                variables.setdefault(stmt_id, []).append(
+                    (sys.intern(gen_handle), var, front_var))
+
+            for stmt_id, rows in variables.items():
+                self._variables[stmt_id] = tuple(rows)
+
+    def _add_breakpoint(self, stmt_id, filename, line):
+        key = (filename, line)
+        if key in self._stmt_ids:
+            self._stmt_ids[key] = None  # Ambiguous.
+        else:
+            self._stmt_ids[key] = stmt_id
+        self._locations[stmt_id] = key
+
+    def _index_file(self, filename, rows):
+        " Build the sorted arrays of a file from (line, stmt_id) tuples. "
+        rows = sorted(rows)
+        self._lines[filename] = array('l', sorted(set(l for l, _ in rows)))
+        self._file_stmts[filename] = (array('l', [l for l, _ in rows]),
+                                      [stmt_id for _, stmt_id in rows])
+
+    def _load_file(self, filename):
+        " Load all breakpoints of one file. (Lazy mode.) "
+        with self._lock:
+            if filename not in self._lines:
+                rows = self._query(HOT_QUERIES['file_breakpoints'][0],
+                                   (filename,))
+                for line, stmt_id in rows:
+                    self._add_breakpoint(stmt_id, filename, line)
+                self._index_file(filename, rows)
+
+    def files(self):
+        """
+        Return the list of all files that contain breakpoints.
+        """
+        if self._files is None:
+            self._files = [row[0] for row in self._query(
+                "SELECT DISTINCT filename FROM breakpoint")]
+        return self._files
+
+    def breakpoint_lines(self, filename):
+        """
+        Return the sorted array of line numbers in this file on which a
+        breakpoint can be set. (Don't modify it.)
+        """
+        if self.lazy:
+            self._load_file(filename)
+        return self._lines.get(filename, array('l'))
+
+    def has_breakpoint(self, filename, line):
+        " True when a breakpoint can be set on this line. "
+        lines = self.breakpoint_lines(filename)
+        i = bisect_left(lines, line)
+        return i < len(lines) and lines[i] == line
+
+    def stmt_id(self, filename, line):
+        """
+        Return the stmt id for this line, or `None` when there is not exactly
+        one statement on this line.
+        """
+        if self.lazy:
+            self._load_file(filename)
+        return self._stmt_ids.get((filename, line))
+
+    def stmt_ids_in_range(self, filename, start=None, end=None):
+        """
+        Return the stmt ids of all statements in this file between line
+        `start` and `end` (inclusive). Without `start` and `end`, return all
+        statements of the file. Unlike `stmt_id`, lines with several
+        statements yield all of them.
+        """
+        return [stmt_id for _, stmt_id in
+                self.statements_in_range(filename, start, end)]
+
+    def statements_in_range(self, filename, start=None, end=None):
+        """
+        Like `stmt_ids_in_range`, but return (line, stmt id) tuples.
+        """
+        if self.lazy:
+            self._load_file(filename)
+        if filename not in self._file_stmts:
+            return []
+        lines, stmt_ids = self._file_stmts[filename]
+        i = 0 if start is None else bisect_left(lines, start)
+        j = len(lines) if end is None else bisect_right(lines, end)
+        return list(zip(lines[i:j], stmt_ids[i:j]))
+
+    def location(self, stmt_id):
+        """
+        Return the (filename, line) tuple for this stmt id.
+        """
+        if stmt_id not in self._locations:
+            if not self.lazy:
+                return None
+            rows = self._query(HOT_QUERIES['location'][0], (stmt_id,))
+            if not rows:
+                return None
+            self._locations[stmt_id] = tuple(rows[0])
+        return self._locations[stmt_id]
+
+    def variables(self, stmt_id):
+        """
+        Return the (gen_handle, var, front_var) tuples of the variables that
+        are visible at this statement.
+        """
+        if self.lazy and stmt_id not in self._variables:
+            rows = self._query(HOT_QUERIES['variables'][0], (stmt_id,))
+            self._variables[stmt_id] = tuple(
+                (sys.intern(gen_handle), var, front_var)
+                for gen_handle, var, front_var, _ in rows)
+        return self._variables.get(stmt_id, ())
+
+    def stmt_ids(self):
+        """
+        Return all the stmt ids in the database.
+        """
+        if self.lazy:
+            return [row[0] for row in self._query("SELECT id FROM breakpoint")]
+        return list(self._locations)
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class ResolvedHandleCache(object):
+    """
+    Cache of the fully resolved simulator handles for each statement.
+
+    For every stmt id, this keeps the tuple of handles to read from the
+    simulator (``TOP.<gen_handle>.<var>``) and the tuple of front-end names to
+    display. The cache is cleared when `top` changes.
+
+    :param db: `DebugDatabase` instance.
+    :param eager: Resolve the handles of all statements right away.
+    """
+    def __init__(self, db, top='TOP', eager=False):
+        self.db = db
+        self._top = top
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if eager:
+            self.build_all()
+
+    @property
+    def top(self):
+        return self._top
+
+    @top.setter
+    def top(self, value):
+        with self._lock:
+            if value != self._top:
+                self._top = value
+                self._entries = {}
+
+    def _resolve(self, stmt_id, top):
+        handles = []
+        names = []
+        for gen_handle, var, front_var in self.db.variables(stmt_id):
+            if top not in gen_handle:
+                handle = top + "." + gen_handle
+            else:
+                handle = gen_handle
+            handles.append(handle + "." + var)
+            names.append(front_var)
+        return tuple(handles), tuple(names)
+
+    def get(self, stmt_id):
+        """
+        Return a (handles, names) tuple for this stmt id.
+        """
+        entry = self._entries.get(stmt_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        top = self._top
+        entry = self._resolve(stmt_id, top)
+        with self._lock:
+            # Don't store handles that were resolved for an old top.
+            if top == self._top:
+                self._entries[stmt_id] = entry
+        return entry
+
+    def build_all(self):
+        """
+        Resolve the handles of every statement in the database.
+        """
+        top = self._top
+        entries = {}
+        for stmt_id in self.db.stmt_ids():
+            entries[stmt_id] = self._resolve(stmt_id, top)
+        with self._lock:
+            if top == self._top:
+                self._entries = entries
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
@@ -0,0 +1,155 @@
+"""
+Instrumentation of the debugger.
+
+`DebugMetrics` keeps a latency histogram for every phase of a breakpoint hit
+and counts the hits of every statement:
+
+- ``lookup``: resolving the handles and location of the statement.
+- ``http``: every request to the simulator.
+- ``emit``: emitting the Qt signals to the watcher.
+- ``stop_to_render``: from receiving the callback of the simulator until the
+  watcher applied the new values.
+
+Usage::
+
+    metrics = DebugMetrics()
+    with metrics.measure('lookup'):
+        ...
+    print(metrics.report())
+"""
+from __future__ import unicode_literals
+
+from bisect import bisect_left
+from collections import Counter
+import contextlib
+import json
+import threading
+import time
+
+__all__ = (
+    'Histogram',
+    'DebugMetrics',
+)
+
+
+class Histogram(object):
+    """
+    Latency histogram with logarithmic buckets. Bucket `i` counts the
+    durations up to ``min_value * 2 ** i`` seconds.
+    """
+    def __init__(self, min_value=1e-6, bucket_count=28):
+        self.bounds = [min_value * 2 ** i for i in range(bucket_count)]
+        self.counts = [0] * (bucket_count + 1)  # Last one: overflow.
+        self.count = 0
+        self.total = 0.
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def percentile(self, p):
+        """
+        Approximation of the `p` (between 0 and 100) percentile: the upper
+        bound of the bucket that contains it.
+        """
+        if not self.count:
+            return 0.
+        rank = self.count * p / 100.
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if i < len(self.bounds):
+                    return min(self.bounds[i], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'bounds': self.bounds,
+            'counts': self.counts,
+        }
+
+
+class DebugMetrics(object):
+    """
+    All the measurements of one debugging session.
+    """
+    phases = ('lookup', 'http', 'emit', 'stop_to_render')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = dict((name, Histogram()) for name in self.phases)
+        self.hits = Counter()  # stmt_id -> number of hits
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self.histograms[phase].observe(seconds)
+
+    @contextlib.contextmanager
+    def measure(self, phase):
+        " Context manager that measures the duration of this phase. "
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.time() - start)
+
+    def hit(self, stmt_id):
+        with self._lock:
+            self.hits[stmt_id] += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'phases': dict((name, h.to_dict())
+                               for name, h in self.histograms.items()),
+                'hits': dict((str(k), v) for k, v in self.hits.items()),
+            }
+
+    def dump(self, filename, extra=None):
+        """
+        Write all measurements as JSON to this file. (For offline analysis.)
+        """
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    def report(self, top=10):
+        """
+        Return a textual summary.
+        """
+        lines = ['%-16s %8s %10s %10s %10s %10s' % (
+            'phase', 'count', 'mean ms', 'p50 ms', 'p99 ms', 'max ms')]
+        with self._lock:
+            for name in self.phases:
+                h = self.histograms[name]
+                lines.append('%-16s %8i %10.3f %10.3f %10.3f %10.3f' % (
+                    name, h.count, h.mean * 1000, h.percentile(50) * 1000,
+                    h.percentile(99) * 1000, (h.max or 0) * 1000))
+
+            lines.append('')
+            lines.append('Most hit breakpoints:')
+            for stmt_id, count in self.hits.most_common(top):
+                lines.append('  stmt %-10s %8i hits' % (stmt_id, count))
+        return '\n'.join(lines)
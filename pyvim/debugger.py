@@ -1,193 +1,644 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import json
 import os
-import sqlite3
-from flask import Flask, request
-from multiprocessing import Process
-import logging
 import sys
-
-from PyQt5.QtWidgets import QWidget, QTableWidget, QTableWidgetItem,\
-    QVBoxLayout, QLabel
-from PyQt5.QtCore import pyqtSignal, QObject, QThread
-
-
-class ValueWatcher(QWidget):
-    update_signal = pyqtSignal(list, int)
-    update_label = pyqtSignal(str)
-
-    def __init__(self, editor):
-        super().__init__()
-
-        self.setWindowTitle("Variable Watcher")
-        self.setGeometry(0, 0, 300, 200)
-        self.table = QTableWidget()
-        self.label = QLabel()
-        self.label.setText("Current Breakpoint:")
-        self.layout = QVBoxLayout()
-        self.layout.addWidget(self.table)
-        self.layout.addWidget(self.label)
-        self.setLayout(self.layout)
-
-        self.editor = editor
-
-        self.update_signal.connect(self.handle_update)
-        self.update_label.connect(self.handle_text_update)
-        self.show()
-
-    def handle_update(self, values, width):
-        self.table.setRowCount(len(values) / width)
-        self.table.setColumnCount(width)
-        for y, x, v in values:
-            self.table.setItem(y, x, QTableWidgetItem(v))
-        self.table.setHorizontalHeaderLabels(["Variable", "Value"])
-
-    def handle_text_update(self, value):
-        self.label.setText("Current Breakpoint: " + value)
+import threading
+import time
+
+from .breakpoint_condition import BreakpointCondition
+from .callback_server import create_callback_server
+from .debug_database import DebugDatabase, ResolvedHandleCache
+from .debug_metrics import DebugMetrics
+from .simulator import SimulatorClient, TIMEOUT
+from .value_history import ValueHistory
+from .watcher import ValueWatcher
+
+
+class BreakpointQueue(object):
+    """
+    Queue of breakpoint hits, waiting to be processed.
+
+    It only holds the most recent stmt id: when a new breakpoint arrives
+    before the previous one was processed, the stale one is dropped.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, stmt_id):
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (stmt_id, time.time())
+            self._condition.notify()
+
+    def get(self):
+        """
+        Wait for the next hit. Returns a (stmt_id, time received) tuple, or
+        (None, None) when the queue was closed.
+        """
+        with self._condition:
+            while self._pending is None and not self._closed:
+                self._condition.wait()
+            pending = self._pending or (None, None)
+            self._pending = None
+            return pending
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._pending = None
+            self._condition.notify_all()
 
 
 class Debugger:
 
     def __init__(self, editor, hostname="localhost", port_num=8888,
-                 database="debug.db"):
+                 database="debug.db", pool_size=10, connect_timeout=1.,
+                 read_timeout=5., retries=2, max_workers=None,
+                 value_timeout=2., lazy_database=False,
+                 eager_handles=False, callback_server="builtin",
+                 highlight_changes=True, fetch_threshold=500,
+                 lazy_values=False, history_size=1000,
+                 connect_delay=.1, max_connect_delay=10.,
+                 index_directory=None):
         self.host_name = hostname
         self.port_num = port_num
         self.editor = editor
         self.debugger_port = 8889
 
-        # open the database file
-        database = os.path.abspath(database)
-        # since it is read-only, this is fine
-        self.conn = sqlite3.connect(database, check_same_thread=False)
-        self.cursor = self.conn.cursor()
-
-        # disable flask logging
-        log = logging.getLogger('werkzeug')
-        log.setLevel(logging.ERROR)
-
-        # flask app
-        self.app = Flask(__name__)
-
-        self.top = "TOP"
-
-        self.watcher = ValueWatcher(self)
-
-        # define route
-        @self.app.route("/status/breakpoint", methods=["POST"])
-        def hit_breakpoint():
-            id_ = request.get_data()
-            id_ = int(id_)
-            self.update(id_)
-            return "Okay", 200
-
-        class Worker(QThread):
-            app = self.app
-            debugger_port = self.debugger_port
-
-            def __init__(self):
-                QThread.__init__(self)
-
-            def run(self):
-                self.app.run(host="0.0.0.0", port=self.debugger_port)
-
-        self.server_process = Worker()
-        self.server_process.start()
-
-        self.connect()
+        # pooled keep-alive connection to the simulator
+        self.client = SimulatorClient(hostname, port_num,
+                                      pool_size=pool_size,
+                                      connect_timeout=connect_timeout,
+                                      read_timeout=read_timeout,
+                                      retries=retries,
+                                      max_workers=max_workers,
+                                      value_timeout=value_timeout)
+
+        # open the database file and index it
+        self.db = DebugDatabase(database, lazy=lazy_database,
+                                index_directory=index_directory)
+        if self.db.warnings:
+            self.editor.show_message("; ".join(self.db.warnings))
+        self.handle_cache = ResolvedHandleCache(self.db, top="TOP",
+                                                eager=eager_handles)
+
+        # timings of every phase of a breakpoint hit
+        self.metrics = DebugMetrics()
+        self.client.observer = lambda t: self.metrics.observe("http", t)
+        self._stop_times = {}
+
+        self.watcher = ValueWatcher(self, highlight_changes)
+        self.watcher.model.rows_updated.connect(self._rendered)
+
+        # the generation, handles, stmt id and hit number shown in the
+        # watcher, and the last value of every handle, to only send the
+        # values that changed
+        self._generation = 0
+        self._shown = (0, None, None, None)
+        self._last_values = {}
+        # False when the watcher shows a lazy stop: some of its values were
+        # never fetched, so the next stop can't only send what changed
+        self._shown_complete = False
+
+        # values of the previous breakpoint hits, (stmt id, hit) of the
+        # current stop
+        self.history = ValueHistory(max_entries=history_size)
+        self.current_stop = None
+
+        # (absolute filename, line) of the current stop, highlighted in the
+        # editor
+        self.stop_location = None
+
+        # conditions of the breakpoints that are evaluated here (when the
+        # simulator can't), stmt id -> BreakpointCondition
+        self.conditions = {}
+        self.skipped_hits = 0
+
+        # stmt ids of the breakpoints that are set in the simulator
+        self.active_breakpoints = set()
+
+        # line numbers for the breakpoint margin: the breakpoint lines of
+        # every opened buffer location, and the lines of the breakpoints that
+        # are set, per filename; they are updated when a buffer opens or a
+        # breakpoint changes, so that rendering doesn't access the database
+        self._breakpoint_locations = {}  # stmt id -> (filename, line)
+        self._available_lines = {}  # location -> (filename, lines)
+        self._active_lines = {}  # filename -> lines
+
+        # in lazy mode, or for statements with more variables than the
+        # threshold, only the values visible in the watcher are fetched
+        self.lazy_values = lazy_values
+        self.fetch_threshold = fetch_threshold
+        self.fetch_chunk_size = 64
+        self._fetch_executor = ThreadPoolExecutor(max_workers=1)
+        self._fetches = []
+        self._fetches_lock = threading.Lock()
+        self.cancelled_fetches = 0
+        self.watcher.model.fetch_requested.connect(self._fetch_requested)
+
+        # breakpoint hits are handled outside of the callback, so that the
+        # simulator doesn't wait for all the values to be fetched
+        self.breakpoints = BreakpointQueue()
+        self.breakpoint_thread = threading.Thread(
+            target=self._process_breakpoints)
+        self.breakpoint_thread.daemon = True
+        self.breakpoint_thread.start()
+
+        # listen for the /status/breakpoint callbacks of the simulator
+        self.server = create_callback_server(callback_server,
+                                             self.breakpoints.put,
+                                             port=self.debugger_port)
+        self.server.start()
+
+        # connect in the background, so that the editor doesn't wait for the
+        # simulator to start; commands that need the simulator are queued
+        # until then
+        self.connection_state = "connecting"
+        self.connect_attempts = 0
+        self.connect_delay = connect_delay
+        self.max_connect_delay = max_connect_delay
+        self._queued = []
+        self._connection_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.connect_thread = threading.Thread(target=self._connect_loop)
+        self.connect_thread.daemon = True
+        self.connect_thread.start()
+
+    @property
+    def top(self):
+        return self.handle_cache.top
+
+    @top.setter
+    def top(self, value):
+        # resolved handles depend on the top module name
+        self.handle_cache.top = value
 
     def stop(self):
-        self.server_process.terminate()
+        self._stopped.set()
+        self.breakpoints.close()
+        self._fetch_executor.shutdown(wait=False)
+        self.server.stop()
+        self.client.close()
 
     def connect(self):
-        try:
-            r = requests.post("http://{0}:{1}/connect".format(self.host_name,
-                                                              self.port_num),
-                              data="{0}:{1}".format("0.0.0.0",
-                                                    self.debugger_port))
-            error = r.status_code != 200
-        except requests.exceptions.ConnectionError:
-            error = True
-        if error:
-            self.editor.show_message("Failed to connect to simulator")
-
-    def update(self, stmt_id):
-        self.cursor.execute("SELECT * from variable WHERE id=?", (stmt_id,))
-        result = self.cursor.fetchall()
-        table = []
-        for gen_handle, var, front_var, _ in result:
-            if self.top not in gen_handle:
-                handle = self.top + "." + gen_handle
-            else:
-                handle = gen_handle
-            handle = handle + "." + var
+        " Try to connect to the simulator once. Returns True on success. "
+        r = self.client.post("/connect",
+                             data="{0}:{1}".format("0.0.0.0",
+                                                   self.debugger_port))
+        if not self.client.ok(r):
+            return False
+        self.client.detect_capabilities()
+        return True
+
+    @property
+    def connected(self):
+        return self.connection_state == "connected"
+
+    def _set_connection_state(self, state):
+        self.connection_state = state
+        self.editor.invalidate()
+
+    def _connect_loop(self):
+        """
+        Retry connecting, with exponential backoff, until the simulator
+        answers. Then run the queued commands.
+        """
+        delay = self.connect_delay
+        while not self._stopped.is_set():
+            self.connect_attempts += 1
+            if self.connect():
+                # run the queue in order, including the commands that are
+                # queued meanwhile, before new commands can run directly
+                sent = 0
+                while True:
+                    with self._connection_lock:
+                        queued, self._queued = self._queued, []
+                        if not queued:
+                            self._set_connection_state("connected")
+                            break
+                    for func in queued:
+                        func()
+                    sent += len(queued)
+                if sent:
+                    self.editor.show_message(
+                        "Connected to simulator, {0} queued commands "
+                        "sent".format(sent))
+                return
+
+            self._set_connection_state(
+                "waiting (attempt {0})".format(self.connect_attempts))
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_connect_delay)
+
+    def _when_connected(self, func):
+        """
+        Call `func` now when connected to the simulator, otherwise queue it
+        until the connection is made.
+        """
+        with self._connection_lock:
+            if not self.connected:
+                self._queued.append(func)
+                self.editor.show_message(
+                    "Simulator not connected yet, command queued")
+                return
+        func()
+
+    def _process_breakpoints(self):
+        while True:
+            stmt_id, received = self.breakpoints.get()
+            if stmt_id is None:
+                return
             try:
-                r = requests.get(
-                    "http://{0}:{1}/value/{2}".format(self.host_name,
-                                                      self.port_num,
-                                                      handle))
-                error = r.status_code != 200
-            except requests.exceptions.ConnectionError:
-                error = True
-                r = None
-            if error:
+                self.update(stmt_id, received)
+            except Exception as e:
+                # keep the thread alive for the next breakpoint
+                self.editor.show_message(
+                    "Unable to update breakpoint {0}: {1}".format(stmt_id, e))
+
+    def _fetch_values(self, handles):
+        """
+        Read these handles from the simulator. Returns the values and, for
+        every value, whether it changed since the last time it was read.
+        """
+        values = []
+        for value in self.client.get_values(handles):
+            if value is None:
                 value = "ERROR"
+            values.append(str(value))
+
+        last_values = self._last_values
+        changed = [last_values.get(handle, value) != value
+                   for handle, value in zip(handles, values)]
+        last_values.update(zip(handles, values))
+        return values, changed
+
+    def _fetch_requested(self, generation, rows):
+        # called in the Qt thread, when the watcher displays rows of which
+        # the value is not known yet
+        chunk = self.fetch_chunk_size
+        with self._fetches_lock:
+            self._fetches = [f for f in self._fetches if not f.done()]
+            for i in range(0, len(rows), chunk):
+                self._fetches.append(self._fetch_executor.submit(
+                    self._fetch_rows, generation, rows[i:i + chunk]))
+
+    def _cancel_fetches(self):
+        " Drop the fetches for the previous breakpoint that didn't start. "
+        with self._fetches_lock:
+            fetches, self._fetches = self._fetches, []
+        self.cancelled_fetches += sum(f.cancel() for f in fetches)
+
+    def _fetch_rows(self, generation, rows):
+        shown_generation, handles, stmt_id, hit = self._shown
+        if generation != shown_generation or handles is None:
+            return  # another breakpoint was hit in the meantime
+        values, changed = self._fetch_values([handles[row] for row in rows])
+        self.history.update(stmt_id, hit, rows, values)
+        self.watcher.update_values.emit(
+            generation, list(zip(rows, values, changed)))
+
+    def _location_text(self, stmt_id, hit):
+        location = self.db.location(stmt_id)
+        if location is None:
+            return None
+        filename, ln = location
+        filename = os.path.basename(filename)
+        return "{0}:{1} (hit {2})".format(filename, ln, hit)
+
+    def _rendered(self, generation):
+        # called in the Qt thread, once the watcher shows this generation
+        received = self._stop_times.pop(generation, None)
+        if received is not None:
+            self.metrics.observe("stop_to_render", time.time() - received)
+
+    def _condition_holds(self, stmt_id):
+        """
+        Evaluate the condition of this breakpoint, if it has one. All the
+        values it needs are read at once.
+        """
+        condition = self.conditions.get(stmt_id)
+        if condition is None:
+            return True
+        values = self.client.get_values(list(condition.handles))
+        if any(v is None or v == TIMEOUT for v in values):
+            return True  # rather stop than skip a hit we can't evaluate
+        try:
+            return condition.evaluate(values)
+        except Exception as e:
+            self.editor.show_message(
+                "Unable to evaluate condition {0!r}: {1}".format(
+                    condition.expression, e))
+            return True
+
+    def update(self, stmt_id, received=None):
+        if not self._condition_holds(stmt_id):
+            self.skipped_hits += 1
+            self.continue_()
+            return
+
+        self.metrics.hit(stmt_id)
+        with self.metrics.measure("lookup"):
+            handles, names = self.handle_cache.get(stmt_id)
+            location = self.db.location(stmt_id)
+        self._generation += 1
+        generation = self._generation
+        # only the latest stop can still be rendered
+        self._stop_times = {generation: received or time.time()}
+        shown_handles = self._shown[1]
+        shown_complete = self._shown_complete
+        self._cancel_fetches()
+
+        lazy = self.lazy_values or len(handles) > self.fetch_threshold
+        if lazy:
+            # the watcher asks for the values of the visible rows
+            values = [None] * len(handles)
+            changed = [False] * len(handles)
+        else:
+            values, changed = self._fetch_values(handles)
+        hit = self.history.record(stmt_id, handles, values)
+        self._shown = (generation, handles, stmt_id, hit)
+        self._shown_complete = not lazy
+        self.current_stop = (stmt_id, hit)
+
+        with self.metrics.measure("emit"):
+            if not lazy and shown_complete and handles == shown_handles:
+                # same variables as the previous stop, only send what changed
+                self.watcher.update_cells.emit(
+                    generation, [(idx, values[idx])
+                                 for idx, c in enumerate(changed) if c])
+            else:
+                self.watcher.update_signal.emit(
+                    generation, names, values,
+                    [idx for idx, c in enumerate(changed) if c])
+
+            # update breakpoint line
+            if location is not None:
+                self.watcher.update_label.emit(
+                    self._location_text(stmt_id, hit))
+
+        # jump to the breakpoint line in the editor
+        if location is not None:
+            self.stop_location = (os.path.abspath(location[0]), location[1])
+            self.editor.call_in_loop(self._show_stop, key="stop")
+
+    def _show_stop(self):
+        """
+        Show the file of the current stop and move the cursor to its line.
+        (Called in the event loop of the editor.)
+        """
+        if self.stop_location is None:
+            return
+        filename, line = self.stop_location
+        editor = self.editor
+        wa = editor.window_arrangement
+
+        for eb in wa.editor_buffers:
+            if eb.location and os.path.abspath(eb.location) == filename:
+                break
+        else:
+            eb = wa.open_buffer(filename)
+
+        if eb not in wa.active_tab.visible_editor_buffers():
+            wa.show_editor_buffer(eb)
+            if not editor.application.layout.has_focus(editor.command_buffer):
+                editor.sync_with_prompt_toolkit()
+
+        document = eb.buffer.document
+        row = min(line - 1, document.line_count - 1)
+        eb.buffer.cursor_position = document.translate_row_col_to_index(row, 0)
+
+    def show_history(self, hit=None, other=None):
+        """
+        Show the values of an earlier hit of the current statement in the
+        watcher, with the values that differ from the current hit (or from
+        hit `other`) highlighted. Without `hit`, show which hits are stored.
+        """
+        if self.current_stop is None:
+            self.editor.show_message("No breakpoint hit yet")
+            return
+        stmt_id, current_hit = self.current_stop
+
+        if hit is None:
+            hits = self.history.hits(stmt_id)
+            if hits:
+                self.editor.show_message(
+                    "stmt {0}: hit {1}, history {2}-{3}".format(
+                        stmt_id, current_hit, hits[0], hits[-1]))
             else:
-                value = r.content
-            table.append((front_var, value))
+                self.editor.show_message("No history for stmt {0}".format(
+                    stmt_id))
+            return
 
-        values = []
-        for idx, (var, value) in enumerate(table):
-            values.append((idx, 0, str(var)))
-            values.append((idx, 1, str(value)))
-        self.watcher.update_signal.emit(values, 2)
-
-        # update breakpoint line
-        self.cursor.execute("SELECT * FROM breakpoint WHERE id=?", (stmt_id,))
-        value = self.cursor.fetchone()
-        _, filename, ln = value
-        filename = os.path.basename(filename)
-        self.watcher.update_label.emit(filename + ":" + str(ln))
+        if other is None:
+            other = current_hit
+        values = self.history.get(stmt_id, hit)
+        diff = self.history.diff(stmt_id, other, hit)
+        if values is None or diff is None:
+            self.editor.show_message("Hit {0} is not in the history".format(
+                hit if values is None else other))
+            return
+
+        handles, names = self.handle_cache.get(stmt_id)
+        self._generation += 1
+        # nothing to fetch for this generation; the next breakpoint
+        # replaces all the rows
+        self._shown = (self._generation, None, stmt_id, hit)
+        self.watcher.update_signal.emit(
+            self._generation, names,
+            ["?" if v is None else v for v in values],
+            [row for row, _, _ in diff])
+        self.watcher.update_label.emit(
+            "{0} (history, {1} differ from hit {2})".format(
+                self._location_text(stmt_id, hit), len(diff), other))
+        self.editor.show_message("{0} values differ between hit {1} and "
+                                 "hit {2}".format(len(diff), other, hit))
+
+    def stats(self):
+        """
+        Return a dictionary with the counters of the debugger components.
+        """
+        return {
+            "simulator": self.client.stats(),
+            "handle_cache": self.handle_cache.stats(),
+            "history": {"hits": len(self.history),
+                        "size": self.history.size,
+                        "evicted": self.history.evicted},
+            "dropped_breakpoints": self.breakpoints.dropped,
+            "skipped_hits": self.skipped_hits,
+            "cancelled_fetches": self.cancelled_fetches,
+        }
+
+    def stats_report(self):
+        " Textual report of the metrics and counters. (For :debugstats.) "
+        lines = [self.metrics.report(), ""]
+        for name, value in sorted(self.stats().items()):
+            if isinstance(value, dict):
+                value = ", ".join("{0}={1:.3g}".format(k, v)
+                                  for k, v in sorted(value.items()))
+            lines.append("{0}: {1}".format(name, value))
+        return "\n".join(lines)
+
+    def dump_stats(self, filename):
+        " Write the metrics and counters as JSON to this file. "
+        self.metrics.dump(filename, extra={"counters": self.stats()})
 
     def continue_(self):
-        try:
-            r = requests.post("http://{0}:{1}/continue".format(self.host_name,
-                                                               self.port_num))
-            error = r.status_code != 200
-        except requests.exceptions.ConnectionError:
-            error = True
-        if error:
+        if not self.connected:
+            self.editor.show_message("Simulator not connected yet")
+            return
+        r = self.client.post("/continue")
+        if not self.client.ok(r):
             self.editor.show_message("Unable to connect to the debugger")
 
-    def set_break_point(self, filename, line_number):
+    def set_break_point(self, filename, line_number, condition=None):
+        """
+        Set a breakpoint on this line. With a `condition`, the simulator only
+        stops when the condition holds.
+        """
+        self._when_connected(lambda: self._set_break_point(
+            filename, line_number, condition))
+
+    def _set_break_point(self, filename, line_number, condition):
         if not filename:
             self.editor.show_message("Unable to set a break point")
             return
         filename = os.path.abspath(filename)
 
-        # running query
-        self.cursor.execute(
-            "SELECT id FROM breakpoint WHERE filename=? AND line_num=?",
-            (filename, line_number))
-        r = self.cursor.fetchall()
-        if len(r) != 1:
+        try:
+            stmt_id = self.db.stmt_id(filename, int(line_number))
+        except ValueError:
+            stmt_id = None
+        if stmt_id is None:
             self.editor.show_message("Not a valid breakpoint")
             return
-        stmt_id = r[0][0]
-        try:
-            r = requests.post(
-                "http://{0}:{1}/breakpoint/add/{2}".format(self.host_name,
-                                                           self.port_num,
-                                                           stmt_id))
-            error = r.status_code != 200
-        except requests.exceptions.ConnectionError:
-            error = True
-        if error:
+
+        data = headers = None
+        if condition:
+            handles, names = self.handle_cache.get(stmt_id)
+            try:
+                condition = BreakpointCondition(condition,
+                                                dict(zip(names, handles)))
+            except (SyntaxError, ValueError) as e:
+                self.editor.show_message("Invalid condition: {0}".format(e))
+                return
+            if self.client.supports_conditions:
+                data = json.dumps({"condition": condition.expression,
+                                   "variables": condition.variables})
+                headers = {'Content-Type': 'application/json'}
+                condition = None
+
+        r = self.client.post("/breakpoint/add/{0}".format(stmt_id), data=data,
+                             headers=headers)
+        if not self.client.ok(r):
             self.editor.show_message("Unable to set a break point")
+            return
+        self._add_active([(stmt_id, (filename, int(line_number)))])
+        if condition:
+            self.conditions[stmt_id] = condition
+        else:
+            self.conditions.pop(stmt_id, None)
+
+    def set_break_points(self, filename, start=None, end=None):
+        """
+        Set breakpoints on all statements between line `start` and `end`
+        (inclusive) of this file, or on the whole file.
+        """
+        self._when_connected(lambda: self._set_break_points(
+            filename, start, end))
+
+    def _set_break_points(self, filename, start, end):
+        if not filename:
+            self.editor.show_message("Unable to set break points")
+            return
+        filename = os.path.abspath(filename)
+
+        lines = dict((stmt_id, line) for line, stmt_id in
+                     self.db.statements_in_range(filename, start, end))
+        stmt_ids = sorted(lines)
+        if not stmt_ids:
+            self.editor.show_message("No valid breakpoints")
+            return
+        added = self.client.add_breakpoints(stmt_ids)
+        self._add_active([(stmt_id, (filename, lines[stmt_id]))
+                          for stmt_id in added])
+        for stmt_id in added:
+            self.conditions.pop(stmt_id, None)
+
+        if len(added) == len(stmt_ids):
+            self.editor.show_message(
+                "{0} break points set".format(len(added)))
+        else:
+            self.editor.show_message(
+                "Unable to set {0} of {1} break points".format(
+                    len(stmt_ids) - len(added), len(stmt_ids)))
+
+    def clear_break_points(self):
+        " Remove all the breakpoints that were set. "
+        self._when_connected(self._clear_break_points)
+
+    def _clear_break_points(self):
+        stmt_ids = sorted(self.active_breakpoints)
+        removed = self.client.remove_breakpoints(stmt_ids)
+        self._remove_active(removed)
+        for stmt_id in removed:
+            self.conditions.pop(stmt_id, None)
+
+        if len(removed) == len(stmt_ids):
+            self.editor.show_message(
+                "{0} break points cleared".format(len(removed)))
+        else:
+            self.editor.show_message("Unable to clear {0} break points".format(
+                len(stmt_ids) - len(removed)))
+
+    def _add_active(self, breakpoints):
+        " Record (stmt id, (filename, line)) pairs of breakpoints that are set. "
+        for stmt_id, location in breakpoints:
+            self.active_breakpoints.add(stmt_id)
+            self._breakpoint_locations[stmt_id] = location
+        self._update_active_lines(set(l[0] for _, l in breakpoints))
+
+    def _remove_active(self, stmt_ids):
+        " Forget these breakpoints. "
+        filenames = set()
+        for stmt_id in stmt_ids:
+            self.active_breakpoints.discard(stmt_id)
+            location = self._breakpoint_locations.pop(stmt_id, None)
+            if location is not None:
+                filenames.add(location[0])
+        self._update_active_lines(filenames)
+
+    def _update_active_lines(self, filenames):
+        for filename in filenames:
+            self._active_lines[filename] = frozenset(
+                line for f, line in self._breakpoint_locations.values()
+                if f == filename)
+        self.editor.invalidate()
+
+    def file_opened(self, location):
+        """
+        Read the breakpoint lines of a buffer location that was opened, for
+        the margin.
+        """
+        filename = os.path.abspath(location)
+        self._available_lines[location] = (
+            filename, frozenset(self.db.breakpoint_lines(filename)))
+
+    def margin_lines(self, location):
+        """
+        Return the (available, active) sets of line numbers with a breakpoint
+        for this buffer location. This doesn't access the database: the lines
+        are computed when the buffer is opened and when a breakpoint changes.
+        """
+        filename, available = self._available_lines.get(
+            location, (None, frozenset()))
+        return available, self._active_lines.get(filename, frozenset())
 
     def get_all_files(self):
-        # running query
-        self.cursor.execute("SELECT DISTINCT filename FROM breakpoint")
-        result = self.cursor.fetchall()
-        return [x[0] for x in result]
+        return self.db.files()
 
     def get_available_breakpoints(self):
         eb = self.editor.current_editor_buffer
@@ -197,7 +648,4 @@ class Debugger:
         if filename is None:
             return []
         filename = os.path.abspath(filename)
-        self.cursor.execute("SELECT line_num FROM breakpoint WHERE filename=?",
-                            (filename,))
-        result = self.cursor.fetchall()
-        return [x[0] for x in result]
+        return self.db.breakpoint_lines(filename)
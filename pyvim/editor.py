@@ -9,8 +9,9 @@ Usage::
 """
 from __future__ import unicode_literals
 
+from asyncio import get_event_loop
+from collections import OrderedDict
 import contextlib
-import time
 import threading
 import signal
 
@@ -22,7 +23,6 @@ from prompt_toolkit.history import FileHistory
 from prompt_toolkit.key_binding.vi_state import InputMode
 from prompt_toolkit.styles import DynamicStyle
 from prompt_toolkit.utils import in_main_thread
-from prompt_toolkit.eventloop import get_event_loop
 
 from .commands.completer import create_command_completer
 from .commands.handler import handle_command
@@ -33,6 +33,7 @@ from .layout import EditorLayout, get_terminal_title
 from .style import generate_built_in_styles, get_editor_style_by_name
 from .window_arrangement import WindowArrangement
 from .io import FileIO, DirectoryIO, HttpIO, GZipFileIO
+from .reporting import create_default_dispatcher
 from .debugger import Debugger
 
 import pygments
@@ -44,27 +45,47 @@ __all__ = (
 
 
 @contextlib.contextmanager
-def _auto_refresh_context(app, refresh_interval=None):
-    " Return a context manager for the auto-refresh loop. "
+def _auto_refresh_context(editor):
+    """
+    Return a context manager for the auto-refresh loop.
+
+    Changes are drawn by calling `Editor.invalidate`, this loop is only a
+    fallback. Every `editor.refresh_interval` seconds, it redraws when an
+    invalidation was missed (e.g. because it happened before the application
+    was running) or when the terminal was resized. With an interval of 0, it
+    doesn't wake up at all.
+    """
     done = [False]  # nonlocal
+    app = editor.application
+    wakeup = editor._refresh_wakeup
 
     # Enter.
 
     def run():
-        while not done[0]:
-            time.sleep(refresh_interval)
-            app.invalidate()
-
-    if refresh_interval:
-        t = threading.Thread(target=run)
-        t.daemon = True
-        t.start()
+        size = None
+        while True:
+            wakeup.wait(editor.refresh_interval or None)
+            wakeup.clear()
+            if done[0]:
+                return
+
+            if app.is_running:
+                new_size = app.output.get_size()
+                if editor._dirty or new_size != size:
+                    size = new_size
+                    app.invalidate()
+
+    t = threading.Thread(target=run)
+    t.daemon = True
+    t.start()
 
     try:
         yield
     finally:
         # Exit.
         done[0] = True
+        wakeup.set()
+
 
 class Editor(object):
     """
@@ -73,9 +94,18 @@ class Editor(object):
     :param config_directory: Place where configuration is stored.
     :param input: (Optionally) `prompt_toolkit.input.Input` object.
     :param output: (Optionally) `prompt_toolkit.output.Output` object.
+    :param refresh_interval: Seconds between the checks for missed redraws
+        and terminal resizes. 0 disables the periodic refresh.
+    :param report_processes: Number of worker processes for CPU bound
+        checkers, like pyflakes. 0 runs them in threads.
+    :param callback_server: Server for the callbacks of the simulator,
+        'builtin' or 'flask'.
+    :param lazy_database: Query the debug database on demand, instead of
+        indexing it in memory at startup.
     """
     def __init__(self, database, config_directory='~/.pyvim', input=None,
-                 output=None):
+                 output=None, refresh_interval=.3, report_processes=2,
+                 callback_server='builtin', lazy_database=False):
         self.input = input
         self.output = output
 
@@ -99,6 +129,8 @@ class Editor(object):
         self.cursorline = False  # ':set cursorline'
         self.cursorcolumn = False  # ':set cursorcolumn'
         self.colorcolumn = []  # ':set colorcolumn'. List of integers.
+        self.report_delay = .5  # Seconds without changes before linting.
+        self.background_read_size = 8 * 1024 * 1024  # Bytes.
 
         # Ensure config directory exists.
         self.config_directory = os.path.abspath(os.path.expanduser(config_directory))
@@ -108,6 +140,13 @@ class Editor(object):
         self.window_arrangement = WindowArrangement(self)
         self.message = None
 
+        # Checkers, by file type. (Results are cached in the config
+        # directory.)
+        self.reporter = create_default_dispatcher(
+            cache_directory=os.path.join(self.config_directory, 'reports'),
+            processes=report_processes)
+        self.reporter.warm_up()
+
         # Load styles. (Mapping from name to Style class.)
         self.styles = generate_built_in_styles()
         self.current_style = get_editor_style_by_name('vim')
@@ -122,6 +161,16 @@ class Editor(object):
 
         self.thread = None
 
+        # Functions to be called in the event loop. (See `call_in_loop`.)
+        self._pending_calls = OrderedDict()
+        self._pending_lock = threading.Lock()
+
+        # Redrawing. `_dirty` is set by `invalidate` and cleared after
+        # rendering. (See `_auto_refresh_context`.)
+        self._dirty = False
+        self._refresh_wakeup = threading.Event()
+        self._refresh_interval = refresh_interval
+
         # Create history and search buffers.
         def handle_action(buff):
             ' When enter is pressed in the Vi command line. '
@@ -160,11 +209,18 @@ class Editor(object):
             self.message = None
         self.application.key_processor.before_key_press += key_pressed
 
+        def rendered(_):
+            self._dirty = False
+        self.application.after_render += rendered
+
         # Command line previewer.
         self.previewer = CommandPreviewer(self)
 
         # Debugger
-        self.debugger = Debugger(self, database=database)
+        self.debugger = Debugger(
+            self, database=database, callback_server=callback_server,
+            lazy_database=lazy_database,
+            index_directory=os.path.join(self.config_directory, 'index'))
 
     def load_initial_files(self, locations, in_tab_pages=False, hsplit=False, vsplit=False):
         """
@@ -250,6 +306,50 @@ class Editor(object):
         bottom.
         """
         self.message = message
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Redraw the screen. This is thread safe, and several calls before the
+        next redraw result in only one redraw.
+        """
+        self._dirty = True
+        self.application.invalidate()
+
+    @property
+    def refresh_interval(self):
+        " Seconds between the periodic refreshes, 0 when disabled. "
+        return self._refresh_interval
+
+    @refresh_interval.setter
+    def refresh_interval(self, value):
+        self._refresh_interval = value
+        self._refresh_wakeup.set()  # Apply the new interval right away.
+
+    def call_in_loop(self, func, key=None):
+        """
+        Call `func` in the event loop of the application and redraw. This can
+        be called from other threads, like the debugger. When calls with the
+        same `key` are still pending, only the last one is executed.
+        """
+        with self._pending_lock:
+            schedule = not self._pending_calls
+            self._pending_calls[object() if key is None else key] = func
+
+        if schedule:
+            app = self.application
+            if app.is_running:
+                app.loop.call_soon_threadsafe(self._run_pending_calls)
+            else:
+                self._run_pending_calls()
+
+    def _run_pending_calls(self):
+        with self._pending_lock:
+            calls = list(self._pending_calls.values())
+            self._pending_calls.clear()
+        for func in calls:
+            func()
+        self.invalidate()
 
     def use_colorscheme(self, name='default'):
         """
@@ -295,7 +395,7 @@ class Editor(object):
 
         # Run eventloop of prompt_toolkit.
         def run():
-            with _auto_refresh_context(self.application, .3):
+            with _auto_refresh_context(self):
                 try:
                     self.application.run(pre_run=pre_run)
                 except BaseException as e:
@@ -1,24 +1,17 @@
 from __future__ import unicode_literals
-from prompt_toolkit.application.current import get_app
 from prompt_toolkit.buffer import Buffer
 from prompt_toolkit.document import Document
-from prompt_toolkit import __version__ as ptk_version
+from prompt_toolkit.filters import Condition
 
 from pyvim.completion import DocumentCompleter
-from pyvim.reporting import report
+from pyvim.reporting import text_digest
 
 from six import string_types
 
 import os
+import threading
 import weakref
 
-PTK3 = ptk_version.startswith('3.')
-
-if PTK3:
-    from asyncio import get_event_loop
-else:
-    from prompt_toolkit.eventloop import call_from_executor, run_in_executor
-
 __all__ = (
     'EditorBuffer',
 )
@@ -48,9 +41,26 @@ class EditorBuffer(object):
 
         self.is_debug = False
 
+        # True while a large file is read in the background. (The buffer is
+        # read-only until then.)
+        self.loading = False
+
+        # True when the file exists but could not be read, `read_error` tells
+        # why. The buffer is read-only then, so that writing it doesn't
+        # truncate the file.
+        self.read_failed = False
+        self.read_error = None
+
         # Read text.
-        if location:
+        if location and self._is_large_file(location):
+            self.is_new = False
+            self.loading = True
+            text = ''
+        elif location:
             text = self._read(location)
+            if text is None:
+                self.read_failed = True
+                text = ''
         else:
             text = text or ''
 
@@ -61,17 +71,46 @@ class EditorBuffer(object):
             multiline=True,
             completer=DocumentCompleter(editor, self),
             document=Document(text, 0),
+            read_only=Condition(lambda: self.loading or self.read_failed),
             on_text_changed=lambda _: self.run_reporter())
 
-        # List of reporting errors.
+        # List of reporting errors, and the same errors indexed by line.
         self.report_errors = []
-        self._reporter_is_running = False
+        self._report_handle = None  # Scheduled run, in the event loop.
+        self._report_future = None
+        self._last_report = (None, [])  # (text digest, errors)
+
+        if self.loading:
+            t = threading.Thread(target=self._load_in_background,
+                                 args=(location, ))
+            t.daemon = True
+            t.start()
 
     @property
     def editor(self):
         """ Back reference to the Editor. """
         return self._editor_ref()
 
+    @property
+    def report_errors(self):
+        " List of `ReporterError` instances for this buffer. "
+        return self._report_errors
+
+    @report_errors.setter
+    def report_errors(self, errors):
+        # Index the errors once, instead of scanning them for every line
+        # that is rendered.
+        by_line = {}
+        for e in errors:
+            by_line.setdefault(e.lineno, []).append(e)
+
+        self._report_errors = errors
+        self._report_errors_by_line = by_line
+
+    def report_errors_at(self, lineno):
+        " The reporter errors on line `lineno`. (Zero based.) "
+        return self._report_errors_by_line.get(lineno, [])
+
     @property
     def has_unsaved_changes(self):
         """
@@ -86,9 +125,54 @@ class EditorBuffer(object):
         """
         return self.isdir
 
-    def _read(self, location):
+    def _is_large_file(self, location):
+        " True for local files that should be read in the background. "
+        path = os.path.expanduser(location)
+        return ('://' not in location and os.path.isfile(path) and
+                os.path.getsize(path) > self.editor.background_read_size)
+
+    def _load_in_background(self, location):
         """
-        Read file I/O backend.
+        Read a large file. The first chunk is shown as soon as it's decoded,
+        together with the progress. (Called in a separate thread.)
+        """
+        editor = self.editor
+        shown = []
+
+        def set_text(text):
+            self._file_content = text
+            self.buffer.set_document(
+                Document(text, min(self.buffer.cursor_position, len(text))),
+                bypass_readonly=True)
+
+        def progress(chunk, done, total):
+            if not shown:
+                shown.append(True)
+                editor.call_in_loop(lambda: set_text(chunk))
+            if total:
+                editor.call_in_loop(
+                    lambda: editor.show_message('Reading %s... %i%%' % (
+                        location, 100 * done // total)),
+                    key=(self, 'progress'))
+
+        text = self._read(location, progress)
+
+        def done():
+            self.loading = False
+            if text is None:
+                # Keep what was shown, read-only. (Show the error again, a
+                # progress message could have replaced it.)
+                self.read_failed = True
+                editor.show_message(self.read_error)
+            else:
+                set_text(text)
+                editor.show_message('"%s" read' % location)
+
+        editor.call_in_loop(done)
+
+    def _read(self, location, progress=None):
+        """
+        Read file I/O backend. Returns `None` when the file can't be read.
         """
         for io in self.editor.io_backends:
             if io.can_open_location(location):
@@ -100,18 +184,21 @@ class EditorBuffer(object):
                     # File could exist. Read it.
                     self.is_new = False
                     try:
-                        text, self.encoding = io.read(location)
+                        text, self.encoding = io.read(location, progress)
 
-                        # Replace \r\n by \n.
-                        text = text.replace('\r\n', '\n')
+                        if not io.normalizes_text:
+                            # Replace \r\n by \n.
+                            text = text.replace('\r\n', '\n')
 
-                        # Drop trailing newline while editing.
-                        # (prompt-toolkit doesn't enforce the trailing newline.)
-                        if text.endswith('\n'):
-                            text = text[:-1]
+                            # Drop trailing newline while editing.
+                            # (prompt-toolkit doesn't enforce the trailing
+                            # newline.)
+                            if text.endswith('\n'):
+                                text = text[:-1]
                     except Exception as e:
-                        self.editor.show_message('Cannot read %r: %r' % (location, e))
-                        return ''
+                        self.read_error = 'Cannot read %r: %r' % (location, e)
+                        self.editor.show_message(self.read_error)
+                        return None
                     else:
                         return text
                 else:
@@ -119,14 +206,18 @@ class EditorBuffer(object):
                     self.is_new = True
                     return ''
 
-        self.editor.show_message('Cannot read: %r' % location)
-        return ''
+        self.read_error = 'Cannot read: %r' % location
+        self.editor.show_message(self.read_error)
+        return None
 
     def reload(self):
         """
         Reload file again from storage.
         """
         text = self._read(self.location)
+        if text is None:
+            return  # Keep the current text.
+        self.read_failed = False
         cursor_position = min(self.buffer.cursor_position, len(text))
 
         self.buffer.document = Document(text, cursor_position)
@@ -136,11 +227,21 @@ class EditorBuffer(object):
         """
         Write file to I/O backend.
         """
+        # Don't overwrite a file that we could not read.
+        if self.read_failed and location in (None, self.location):
+            self.editor.show_message(
+                'Not written: %r could not be read' % self.location)
+            return
+
         # Take location and expand tilde.
         if location is not None:
             self.location = location
         assert self.location
 
+        if self.loading:
+            self.editor.show_message('Still reading %s' % self.location)
+            return
+
         # Find I/O backend that handles this location.
         for io in self.editor.io_backends:
             if io.can_open_location(self.location):
@@ -158,6 +259,7 @@ class EditorBuffer(object):
         else:
             # When the save succeeds: update: _file_content.
             self._file_content = self.buffer.text
+            self.read_failed = False
 
     def get_display_name(self, short=False):
         """
@@ -175,47 +277,73 @@ class EditorBuffer(object):
     def __repr__(self):
         return '%s(buffer=%r)' % (self.__class__.__name__, self.buffer)
 
-    def run_reporter(self):
-        " Buffer text changed. "
-        if not self._reporter_is_running:
-            self._reporter_is_running = True
-
-            text = self.buffer.text
-            self.report_errors = []
-
-            # Don't run reporter when we don't have a location. (We need to
-            # know the filetype, actually.)
-            if self.location is None:
-                return
-
-            # Better not to access the document in an executor.
-            document = self.buffer.document
+    def run_reporter(self, delay=None):
+        """
+        Buffer text changed. Run the checkers for this file type once the
+        text didn't change for `delay` seconds. (`editor.report_delay` by
+        default.)
+        """
+        # Debounce: a new change replaces the scheduled run.
+        if self._report_handle is not None:
+            self._report_handle.cancel()
+            self._report_handle = None
 
-            if PTK3:
-                loop = get_event_loop()
+        self.report_errors = []
 
-            def in_executor():
-                # Call reporter
-                report_errors = report(self.location, document)
+        # Don't check a file that is still being read.
+        if self.loading:
+            return
 
-                def ready():
-                    self._reporter_is_running = False
+        # Don't run reporter when we don't have a location. (We need to
+        # know the filetype, actually.)
+        if self.location is None or \
+                not self.editor.reporter.checkers_for(self.location):
+            return
 
-                    # If the text has not been changed yet in the meantime, set
-                    # reporter errors. (We were running in another thread.)
-                    if text == self.buffer.text:
-                        self.report_errors = report_errors
-                        get_app().invalidate()
-                    else:
-                        # Restart reporter when the text was changed.
-                        self.run_reporter()
+        document = self.buffer.document
 
-                if PTK3:
-                    loop.call_soon_threadsafe(ready)
-                else:
-                    call_from_executor(ready)
+        if delay is None:
+            delay = self.editor.report_delay
 
-            if PTK3:
-                loop.run_in_executor(None, in_executor)
-            else:
-                run_in_executor(in_executor)
+        # Without a running event loop (at startup), start right away.
+        app = self.editor.application
+        if delay and app.is_running:
+            self._report_handle = app.loop.call_later(
+                delay, self._start_reporter, document)
+        else:
+            self._start_reporter(document)
+
+    def _start_reporter(self, document):
+        " Start checking this document in the reporter's workers. "
+        self._report_handle = None
+        digest = text_digest(document.text)
+
+        def ready(errors):
+            self._last_report = (digest, errors)
+
+            # If the text has not been changed yet in the meantime, set
+            # reporter errors. (We were running in another thread.)
+            if document.text == self.buffer.text:
+                self.report_errors = errors
+
+        # Nothing changed since the last run, e.g. after an undo.
+        last_digest, last_errors = self._last_report
+        if digest == last_digest:
+            self.editor.call_in_loop(lambda: ready(last_errors))
+            return
+
+        # A run for older text that didn't start yet is not needed anymore.
+        if self._report_future is not None:
+            self._report_future.cancel()
+
+        def done(future):
+            if not future.cancelled():
+                try:
+                    errors = future.result()
+                except Exception:
+                    errors = []
+                self.editor.call_in_loop(lambda: ready(errors))
+
+        self._report_future = self.editor.reporter.submit(
+            self.location, document, digest)
+        self._report_future.add_done_callback(done)
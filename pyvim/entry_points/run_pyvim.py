@@ -2,13 +2,17 @@
 """
 pyvim: Pure Python Vim clone.
 Usage:
-    pyvim [-p] [-o] [-O] [-u <pyvimrc>] [<location>...]
+    pyvim [-p] [-o] [-O] [-u <pyvimrc>] [--lazy] [--server <name>] [<location>...]
 
 Options:
-    -p           : Open files in tab pages.
-    -o           : Split horizontally.
-    -O           : Split vertically.
-    -u <pyvimrc> : Use this .pyvimrc file instead.
+    -p              : Open files in tab pages.
+    -o              : Split horizontally.
+    -O              : Split vertically.
+    -u <pyvimrc>    : Use this .pyvimrc file instead.
+    --lazy          : Query the debug database on demand, instead of
+                      indexing it at startup. (For very large databases.)
+    --server <name> : Callback server for the simulator: builtin or flask.
+                      [default: builtin]
 """
 from __future__ import unicode_literals
 import docopt
@@ -32,6 +36,8 @@ def run():
     hsplit = a['-o']
     vsplit = a['-O']
     pyvimrc = a['-u']
+    lazy_database = a['--lazy']
+    callback_server = a['--server']
 
     # compute the db
     if len(locations) != 1:
@@ -46,7 +52,8 @@ def run():
     # watcher
     app = QApplication(sys.argv)
     # Create new editor instance.
-    editor = Editor(database)
+    editor = Editor(database, callback_server=callback_server,
+                    lazy_database=lazy_database)
 
     # Apply rc file.
     if pyvimrc:
@@ -0,0 +1,223 @@
+"""
+A local stand-in for the simulator.
+
+It speaks the same HTTP protocol as the real simulator (see
+`pyvim.simulator`), but serves values from a dictionary. This makes it
+possible to test and benchmark the debugger without running a simulation.
+
+Usage::
+
+    sim = FakeSimulator({'TOP.a': '1', 'TOP.b': '2'}, batch=True)
+    sim.start()
+    ...
+    sim.stop()
+
+Or from the command line::
+
+    python -m pyvim.fake_simulator --port 8888 --signals 1000
+"""
+from __future__ import unicode_literals, print_function
+
+import argparse
+import json
+import threading
+import time
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.BaseHTTPServer import HTTPServer
+from six.moves.urllib.parse import unquote
+from six.moves.urllib.request import urlopen
+
+__all__ = (
+    'FakeSimulator',
+)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients that gave up waiting close the connection.
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real simulator.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # Be quiet.
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _reply(self, status, body=''):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.simulator._handle(self, 'GET', self._read_body())
+
+    def do_POST(self):
+        self.server.simulator._handle(self, 'POST', self._read_body())
+
+
+class FakeSimulator(object):
+    """
+    HTTP server that mimics the simulator.
+
+    :param values: Dictionary mapping handles to values.
+    :param batch: Advertise and serve '/value/batch'.
+    :param conditions: Advertise and accept breakpoint conditions.
+    :param latency: Seconds to sleep before answering each request. (To
+        emulate a slow simulator.)
+    """
+    def __init__(self, values=None, host='127.0.0.1', port=0, batch=True,
+                 latency=0, conditions=False):
+        self.values = values or {}
+        self.batch = batch
+        self.conditions = conditions
+        self.latency = latency
+
+        # State recorded from the requests.
+        self.lock = threading.Lock()
+        self.requests = []  # List of (method, path) tuples.
+        self.breakpoints = set()
+        self.breakpoint_conditions = {}  # stmt id -> posted JSON.
+        self.continue_count = 0
+        self.callback_address = None
+
+        self.server = _ThreadingHTTPServer((host, port), _Handler)
+        self.server.simulator = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def hit_breakpoint(self, stmt_id, timeout=5):
+        """
+        Tell the debugger that we stopped at this statement. (Like the real
+        simulator, post to the address received through '/connect'.)
+        Returns the response body.
+        """
+        host, port = self.callback_address.rsplit(':', 1)
+        if host == '0.0.0.0':
+            host = '127.0.0.1'
+        url = 'http://%s:%s/status/breakpoint' % (host, port)
+        data = str(stmt_id).encode('utf-8')
+        return urlopen(url, data, timeout).read()
+
+    @property
+    def capabilities(self):
+        result = ['batch', 'breakpoint_batch'] if self.batch else []
+        if self.conditions:
+            result.append('condition')
+        return result
+
+    def _handle(self, handler, method, body):
+        path = handler.path
+        with self.lock:
+            self.requests.append((method, path))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if method == 'GET' and path == '/capabilities':
+            handler._reply(200, json.dumps(self.capabilities))
+
+        elif method == 'GET' and path.startswith('/value/'):
+            handle = unquote(path[len('/value/'):])
+            if handle in self.values:
+                handler._reply(200, str(self.values[handle]))
+            else:
+                handler._reply(404)
+
+        elif method == 'POST' and path == '/value/batch' and self.batch:
+            handles = json.loads(body.decode('utf-8'))
+            result = [self.values.get(h) for h in handles]
+            handler._reply(200, json.dumps(
+                [None if v is None else str(v) for v in result]))
+
+        elif method == 'POST' and path == '/connect':
+            self.callback_address = body.decode('utf-8')
+            handler._reply(200)
+
+        elif method == 'POST' and path == '/continue':
+            with self.lock:
+                self.continue_count += 1
+            handler._reply(200)
+
+        elif method == 'POST' and path.startswith('/breakpoint/add/'):
+            stmt_id = int(path[len('/breakpoint/add/'):])
+            if body and (not self.conditions or handler.headers.get(
+                    'Content-Type') != 'application/json'):
+                handler._reply(400)
+                return
+            with self.lock:
+                self.breakpoints.add(stmt_id)
+                if body:
+                    self.breakpoint_conditions[stmt_id] = json.loads(
+                        body.decode('utf-8'))
+            handler._reply(200)
+
+        elif method == 'POST' and path.startswith('/breakpoint/remove/'):
+            with self.lock:
+                self.breakpoints.discard(
+                    int(path[len('/breakpoint/remove/'):]))
+            handler._reply(200)
+
+        elif method == 'POST' and path == '/breakpoint/add' and self.batch:
+            with self.lock:
+                self.breakpoints.update(json.loads(body.decode('utf-8')))
+            handler._reply(200)
+
+        elif method == 'POST' and path == '/breakpoint/remove' and self.batch:
+            with self.lock:
+                self.breakpoints.difference_update(
+                    json.loads(body.decode('utf-8')))
+            handler._reply(200)
+
+        else:
+            handler._reply(404)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in simulator.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--signals', type=int, default=100,
+                        help='Number of TOP.sig<n> handles to serve.')
+    parser.add_argument('--no-batch', action='store_true')
+    parser.add_argument('--latency', type=float, default=0)
+    args = parser.parse_args()
+
+    values = dict(('TOP.sig%i' % i, i) for i in range(args.signals))
+    sim = FakeSimulator(values, host=args.host, port=args.port,
+                        batch=not args.no_batch, latency=args.latency)
+    print('Serving %i signals on %s:%i' % (args.signals, args.host, sim.port))
+    try:
+        sim.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -18,11 +18,16 @@ __all__ = (
 
 ENCODINGS = ['utf-8', 'latin-1']
 
+CHUNK_SIZE = 1024 * 1024  # Bytes decoded at a time.
+SAMPLE_SIZE = 64 * 1024  # Bytes used to detect the encoding.
+
 
 class FileIO(EditorIO):
     """
     I/O backend for the native file system.
     """
+    normalizes_text = True
+
     def can_open_location(cls, location):
         # We can handle all local files.
         return '://' not in location and not os.path.isdir(location)
@@ -30,22 +35,14 @@ class FileIO(EditorIO):
     def exists(self, location):
         return os.path.exists(os.path.expanduser(location))
 
-    def read(self, location):
+    def read(self, location, progress=None):
         """
         Read file from disk.
         """
         location = os.path.expanduser(location)
 
-        # Try to open this file, using different encodings.
-        for e in ENCODINGS:
-            try:
-                with codecs.open(location, 'r', e) as f:
-                    return f.read(), e
-            except UnicodeDecodeError:
-                pass  # Try next codec.
-
-        # Unable to open.
-        raise Exception('Unable to open file: %r' % location)
+        with open(location, 'rb') as f:
+            return _read_stream(f, os.fstat(f.fileno()).st_size, progress)
 
     def write(self, location, text, encoding):
         """
@@ -64,18 +61,19 @@ class GZipFileIO(EditorIO):
     It is possible to edit this file as if it were not compressed.
     The read and write call will decompress and compress transparently.
     """
+    normalizes_text = True
+
     def can_open_location(cls, location):
         return FileIO().can_open_location(location) and location.endswith('.gz')
 
     def exists(self, location):
         return FileIO().exists(location)
 
-    def read(self, location):
+    def read(self, location, progress=None):
         location = os.path.expanduser(location)
 
         with gzip.open(location, 'rb') as f:
-            data = f.read()
-        return _auto_decode(data)
+            return _read_stream(f, None, progress)
 
     def write(self, location, text, encoding):
         """
@@ -98,7 +96,7 @@ class DirectoryIO(EditorIO):
     def exists(self, location):
         return os.path.isdir(location)
 
-    def read(self, directory):
+    def read(self, directory, progress=None):
         # Read content.
         content = sorted(os.listdir(directory))
         directories = []
@@ -146,7 +144,7 @@ class HttpIO(EditorIO):
     def exists(self, location):
         return NotImplemented  # We don't know.
 
-    def read(self, location):
+    def read(self, location, progress=None):
         # Do Http request.
         bytes = urllib.request.urlopen(location).read()
 
@@ -170,3 +168,79 @@ def _auto_decode(data):
             pass
 
     return data.decode('utf-8', 'ignore')
+
+
+def detect_encoding(sample):
+    """
+    Guess the encoding from the first bytes of a file.
+    """
+    try:
+        # Not final: the sample can end in the middle of a character.
+        codecs.getincrementaldecoder('utf-8')().decode(sample, False)
+    except UnicodeDecodeError:
+        return 'latin-1'
+    return 'utf-8'
+
+
+def _decode_chunks(f, encoding, data=b''):
+    """
+    Decode the binary file `f`, one chunk at a time, starting with `data`.
+    Yields (text, bytes read) tuples, with '\\r\\n' replaced by '\\n'.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    carry = ''  # A '\r' at the end of the previous chunk.
+
+    while True:
+        if not data:
+            data = f.read(CHUNK_SIZE)
+        final = not data
+
+        text = carry + decoder.decode(data, final)
+        carry = ''
+        if not final and text.endswith('\r'):
+            text, carry = text[:-1], '\r'
+
+        yield text.replace('\r\n', '\n'), len(data)
+
+        if final:
+            return
+        data = b''
+
+
+def _read_stream(f, total=None, progress=None):
+    """
+    Read and decode the binary file `f` in one pass. The encoding is detected
+    from the first bytes. Return a (text, encoding) tuple. Newlines are
+    normalized to '\\n' and the trailing newline is dropped.
+
+    :param total: Size in bytes, if known.
+    :param progress: Callable that receives (text chunk, bytes read, total)
+        after every chunk. It starts again from zero if the text turns out not
+        to be UTF-8 after all.
+    """
+    sample = f.read(SAMPLE_SIZE)
+    encoding = detect_encoding(sample)
+
+    while True:
+        chunks = []
+        done = 0
+        try:
+            for text, size in _decode_chunks(f, encoding, sample):
+                chunks.append(text)
+                done += size
+                if progress is not None:
+                    progress(text, done, total)
+        except UnicodeDecodeError:
+            # Not UTF-8 further down in the file. Latin-1 never fails.
+            f.seek(0)
+            sample = b''
+            encoding = 'latin-1'
+        else:
+            # Drop the trailing newline on the last chunk, not on the
+            # joined text, which would copy it again.
+            while chunks and not chunks[-1]:
+                chunks.pop()
+            if chunks and chunks[-1].endswith('\n'):
+                chunks[-1] = chunks[-1][:-1]
+
+            return ''.join(chunks), encoding
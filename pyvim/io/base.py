@@ -16,6 +16,10 @@ class EditorIO(six.with_metaclass(ABCMeta, object)):
     read/write immediately from an FTP server. Or a GZIP backend for files
     ending with .gz.
     """
+    #: True when `read` returns text with '\n' newlines and without the
+    #: trailing newline, the way the editor keeps it.
+    normalizes_text = False
+
     @abstractmethod
     def can_open_location(cls, location):
         """
@@ -32,10 +36,13 @@ class EditorIO(six.with_metaclass(ABCMeta, object)):
         return True
 
     @abstractmethod
-    def read(self, location):
+    def read(self, location, progress=None):
         """
         Read file for storage. Returns (text, encoding tuple.)
         Can raise IOError.
+
+        Backends that read in chunks call `progress` with (text chunk, bytes
+        read, total bytes or None) after every chunk.
         """
 
     @abstractmethod
@@ -10,7 +10,7 @@ from prompt_toolkit.layout.containers import Window, ConditionalContainer, Color
 from prompt_toolkit.layout.controls import BufferControl
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.layout.dimension import Dimension
-from prompt_toolkit.layout.margins import ConditionalMargin, NumberedMargin
+from prompt_toolkit.layout.margins import ConditionalMargin, Margin, NumberedMargin
 from prompt_toolkit.layout.menus import CompletionsMenu
 from prompt_toolkit.layout.processors import Processor, ConditionalProcessor, BeforeInput, ShowTrailingWhiteSpaceProcessor, Transformation, HighlightSelectionProcessor, HighlightSearchProcessor, HighlightIncrementalSearchProcessor, HighlightMatchingBracketProcessor, TabsProcessor, DisplayMultipleCursors
 from prompt_toolkit.layout.utils import explode_text_fragments
@@ -25,6 +25,7 @@ from .welcome_message import WELCOME_MESSAGE_TOKENS, WELCOME_MESSAGE_HEIGHT, WEL
 import pyvim.window_arrangement as window_arrangement
 from functools import partial
 
+import os
 import re
 import sys
 
@@ -221,11 +222,10 @@ class ReportMessageToolbar(ConditionalContainer):
             eb = editor.window_arrangement.active_editor_buffer
 
             lineno = eb.buffer.document.cursor_position_row
-            errors = eb.report_errors
+            errors = eb.report_errors_at(lineno)
 
-            for e in errors:
-                if e.lineno == lineno:
-                    return e.formatted_text
+            if errors:
+                return errors[0].formatted_text
 
             return []
 
@@ -278,6 +278,9 @@ class WindowStatusBar(FormattedTextToolbar):
                 else:
                     return ''
 
+            def simulator():
+                return ' [simulator: %s]' % editor.debugger.connection_state
+
             return ''.join([
                 ' ',
                 recording(),
@@ -286,6 +289,7 @@ class WindowStatusBar(FormattedTextToolbar):
                 ('*' if editor_buffer.has_unsaved_changes else ''),
                 (' '),
                 mode(),
+                simulator(),
             ])
         super(WindowStatusBar, self).__init__(
             get_text,
@@ -368,6 +372,52 @@ class PyvimScrollOffsets(ScrollOffsets):
         return self.editor.scroll_offset
 
 
+class BreakpointMargin(Margin):
+    """
+    Left margin that marks the lines on which a breakpoint can be set, and
+    the breakpoints that are set.
+    """
+    def __init__(self, editor, editor_buffer):
+        self.editor = editor
+        self.editor_buffer = editor_buffer
+
+    def _lines(self):
+        location = self.editor_buffer.location
+        if location is None:
+            return frozenset(), frozenset()
+        return self.editor.debugger.margin_lines(location)
+
+    def get_width(self, get_ui_content):
+        available, active = self._lines()
+        return 2 if available or active else 0
+
+    def create_margin(self, window_render_info, width, height):
+        available, active = self._lines()
+        encoding = get_app().output.encoding()
+        available_char = _try_char('\u00b7', '.', encoding)
+        active_char = _try_char('\u25cf', '*', encoding)
+
+        result = []
+        last_lineno = None
+
+        # Only look at the lines that are displayed.
+        for lineno in window_render_info.displayed_lines:
+            # Only mark the first row of wrapped lines.
+            if lineno != last_lineno:
+                if lineno + 1 in active:
+                    result.append(('class:breakpoint-margin.active',
+                                   active_char + ' '))
+                elif lineno + 1 in available:
+                    result.append(('class:breakpoint-margin',
+                                   available_char + ' '))
+                else:
+                    result.append(('', '  '))
+            last_lineno = lineno
+            result.append(('', '\n'))
+
+        return result
+
+
 class EditorLayout(object):
     """
     The main layout class.
@@ -487,7 +537,9 @@ class EditorLayout(object):
                 top=(lambda: self.editor.scroll_offset),
                 bottom=(lambda: self.editor.scroll_offset)),
             wrap_lines=wrap_lines,
-            left_margins=[ConditionalMargin(
+            left_margins=[
+                BreakpointMargin(self.editor, editor_buffer),
+                ConditionalMargin(
                     margin=NumberedMargin(
                         display_tildes=True,
                         relative=Condition(lambda: self.editor.relative_number)),
@@ -534,6 +586,9 @@ class EditorLayout(object):
 
             # Reporting of errors, for Pyflakes.
             ReportingProcessor(editor_buffer),
+
+            # Line of the current breakpoint stop.
+            CurrentStopProcessor(self.editor, editor_buffer),
             HighlightSelectionProcessor(),
             ConditionalProcessor(
                 HighlightSearchProcessor(),
@@ -579,18 +634,40 @@ class ReportingProcessor(Processor):
     def apply_transformation(self, transformation_input): 
         fragments = transformation_input.fragments
 
-        if self.editor_buffer.report_errors:
-            for error in self.editor_buffer.report_errors:
-                if error.lineno == transformation_input.lineno:
-                    fragments = explode_text_fragments(fragments)
-                    for i in range(error.start_column, error.end_column):
-                        if i < len(fragments):
-                            fragments[i] = ('class:flakeserror', fragments[i][1])
+        errors = self.editor_buffer.report_errors_at(transformation_input.lineno)
+
+        if errors:
+            fragments = explode_text_fragments(fragments)
+            for error in errors:
+                for i in range(error.start_column,
+                               min(error.end_column, len(fragments))):
+                    fragments[i] = ('class:flakeserror', fragments[i][1])
 
         return Transformation(fragments)
 
 
 
+class CurrentStopProcessor(Processor):
+    """
+    Highlight the line on which the simulator is stopped.
+    """
+    def __init__(self, editor, editor_buffer):
+        self.editor = editor
+        self.editor_buffer = editor_buffer
+
+    def apply_transformation(self, transformation_input):
+        fragments = transformation_input.fragments
+        stop = self.editor.debugger.stop_location
+
+        if (stop is not None and stop[1] == transformation_input.lineno + 1
+                and self.editor_buffer.location
+                and os.path.abspath(self.editor_buffer.location) == stop[0]):
+            fragments = [(f[0] + ' class:current-stop', ) + tuple(f[1:])
+                         for f in fragments]
+
+        return Transformation(fragments)
+
+
 def get_terminal_title(editor):
     """
     Return the terminal title,
@@ -5,17 +5,62 @@ This is a way to highlight syntax errors in an open files.
 Reporters are run in an executor (in a thread) to ensure not blocking the
 input.
 
+The checkers are chosen by file type: `ReportDispatcher` maps file
+extensions to `Checker` instances. By default, Python files are checked with
+pyflakes and Verilog/SystemVerilog files with Verilator (when it's
+installed). Other local tools can be added with `CommandChecker`::
+
+    dispatcher.register(['.vhd'], CommandChecker(
+        'ghdl', ['ghdl', '-s', '{filename}'],
+        r':(?P<line>\\d+):(?P<col>\\d+): (?P<message>.*)'))
+
+Checkers that are CPU bound in Python (like pyflakes) run in a pool of
+worker processes, so that they don't hold the GIL while typing. They get the
+text and return the errors as tuples. Checkers that just wait for an external
+tool run in threads.
+
+The results are cached by (checker, hash of the text) in a `ReportCache`,
+which can also keep them on disk, so that reopening a file after a restart
+shows its errors without running the checkers again. Only checkers that look
+at nothing but the text are cached: the output of external tools also depends
+on the location, the file type and the included files.
+
 Usage::
 
     errors = report('location.py', Document('file content'))
 """
 from __future__ import unicode_literals
-import pyflakes.api
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from prompt_toolkit.document import Document
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
 import string
+import subprocess
+import tempfile
+import threading
+
+import pyflakes.api
 import six
 
 __all__ = (
+    'Checker',
+    'CommandChecker',
+    'PyflakesChecker',
+    'ReportCache',
+    'ReportDispatcher',
+    'ReporterError',
+    'create_default_dispatcher',
     'report',
+    'text_digest',
+    'verilator_checker',
 )
 
 
@@ -29,6 +74,346 @@ class ReporterError(object):
         self.end_column = end_column
         self.formatted_text = formatted_text
 
+    def to_tuple(self):
+        " Serializable form of this error. "
+        return (self.lineno, self.start_column, self.end_column,
+                [tuple(f) for f in self.formatted_text])
+
+    @classmethod
+    def from_tuple(cls, data):
+        lineno, start_column, end_column, formatted_text = data
+        return cls(lineno, start_column, end_column,
+                   [tuple(f) for f in formatted_text])
+
+
+def text_digest(text):
+    " Hash of the text, to know whether it was checked already. "
+    return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+WORD_CHARACTERS = string.ascii_letters + '0123456789_'
+
+
+def _reporter_error(document, lineno, col, prefix, message):
+    """
+    Create a `ReporterError` that underlines the word at this position.
+    """
+    start_index = document.translate_row_col_to_index(lineno, col)
+    end_index = start_index
+    while end_index < len(document.text) and document.text[end_index] in WORD_CHARACTERS:
+        end_index += 1
+
+    return ReporterError(lineno=lineno,
+                         start_column=col,
+                         end_column=col + end_index - start_index,
+                         formatted_text=[
+                             ('class:flakemessage.prefix', prefix + ':'),
+                             ('', ' '),
+                             ('class:flakemessage', message)])
+
+
+class Checker(six.with_metaclass(ABCMeta, object)):
+    """
+    Base class for the checkers. `name` identifies the checker. Checkers with
+    `cpu_bound` set run in a worker process, so they have to be picklable.
+    The results of `cacheable` checkers only depend on the text.
+    """
+    name = None
+    cpu_bound = False
+    cacheable = True
+
+    @abstractmethod
+    def check(self, location, document):
+        " Return a list of `ReporterError` for this document. "
+
+
+class PyflakesChecker(Checker):
+    name = 'pyflakes'
+    cpu_bound = True
+
+    def check(self, location, document):
+        return report_pyflakes(document)
+
+
+class CommandChecker(Checker):
+    """
+    Adapter for a local lint tool.
+
+    The text is written to a temporary file (with the extension of the
+    buffer), and `command` is run with '{filename}' replaced by the name of
+    that file and '{directory}' by the directory of the buffer. Every output
+    line that matches `pattern` becomes an error. The pattern needs a 'line'
+    group, and can have 'col', 'message' and 'filename' groups.
+
+    When the tool is not installed, the checker doesn't report anything.
+    The results are not cached, because they depend on the directory, the
+    extension and the files that are included.
+    """
+    cacheable = False
+
+    def __init__(self, name, command, pattern, timeout=10):
+        self.name = name
+        self.command = list(command)
+        self.pattern = re.compile(pattern)
+        self.timeout = timeout
+
+    @property
+    def available(self):
+        return shutil.which(self.command[0]) is not None
+
+    def check(self, location, document):
+        if not self.available:
+            return []
+
+        fd, filename = tempfile.mkstemp(suffix=os.path.splitext(location)[1])
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(document.text.encode('utf-8'))
+
+            directory = os.path.dirname(os.path.abspath(location))
+            command = [part.format(filename=filename, directory=directory)
+                       for part in self.command]
+            try:
+                output = subprocess.run(
+                    command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    timeout=self.timeout).stdout
+            except (OSError, subprocess.TimeoutExpired):
+                return []
+        finally:
+            os.remove(filename)
+
+        errors = []
+        for line in output.decode('utf-8', 'replace').splitlines():
+            m = self.pattern.search(line)
+            if not m:
+                continue
+            groups = m.groupdict()
+            if groups.get('filename') and groups['filename'] != filename:
+                continue  # Error in an included file.
+
+            lineno = int(groups['line']) - 1
+            if not 0 <= lineno < document.line_count:
+                continue
+            col = int(groups['col']) - 1 if groups.get('col') else 0
+            col = max(0, min(col, len(document.lines[lineno])))
+            errors.append(_reporter_error(
+                document, lineno, col, self.name,
+                groups.get('message') or line))
+        return errors
+
+
+def verilator_checker():
+    " Checker for Verilog and SystemVerilog, using Verilator. "
+    return CommandChecker(
+        'verilator',
+        ['verilator', '--lint-only', '-Wall', '-Wno-DECLFILENAME',
+         '-Wno-fatal', '-I{directory}', '{filename}'],
+        r'^%(Error|Warning)[^:]*: (?P<filename>[^:]+):(?P<line>\d+):'
+        r'((?P<col>\d+):)? (?P<message>.*)$')
+
+
+class ReportCache(object):
+    """
+    LRU cache of checker results, keyed by (checker name, text digest).
+
+    :param max_entries: Number of results kept in memory.
+    :param directory: When given, results are also written to this
+        directory, and read from it when they are not in memory.
+    :param max_files: Number of results kept in `directory`.
+    """
+    def __init__(self, max_entries=256, directory=None, max_files=1000):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _filename(self, checker, digest):
+        return os.path.join(self.directory, '%s-%s.json' % (checker, digest))
+
+    def get(self, checker, digest):
+        """
+        Return the list of `ReporterError` instances, or `None`.
+        """
+        key = (checker, digest)
+        with self._lock:
+            errors = self._entries.get(key)
+            if errors is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return errors
+
+        if self.directory is not None:
+            try:
+                with open(self._filename(checker, digest)) as f:
+                    errors = [ReporterError.from_tuple(e)
+                              for e in json.load(f)]
+            except (IOError, OSError, ValueError, TypeError):
+                pass
+            else:
+                self._store(key, errors)
+                with self._lock:
+                    self.hits += 1
+                return errors
+
+        with self._lock:
+            self.misses += 1
+
+    def put(self, checker, digest, errors):
+        self._store((checker, digest), errors)
+
+        if self.directory is not None:
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory)
+                with open(self._filename(checker, digest), 'w') as f:
+                    json.dump([e.to_tuple() for e in errors], f)
+                self._prune_files()
+            except (IOError, OSError):
+                pass
+
+    def _store(self, key, errors):
+        with self._lock:
+            self._entries[key] = errors
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_files(self):
+        " Remove the oldest files when there are too many. "
+        names = os.listdir(self.directory)
+        if len(names) > self.max_files:
+            paths = sorted((os.path.join(self.directory, n) for n in names),
+                           key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_files]:
+                os.remove(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _check_in_process(checker, location, text):
+    " Run a checker in a worker process. Returns the errors as tuples. "
+    return [e.to_tuple() for e in checker.check(location, Document(text))]
+
+
+def _warm_up():
+    " Nothing to do, importing this module was the point. "
+
+
+class ReportDispatcher(object):
+    """
+    Runs the checkers that are registered for the type of a file.
+
+    :param cache: `ReportCache` for the results, or `None`.
+    :param processes: Number of worker processes for the CPU bound checkers.
+        With 0, all checkers run in threads.
+    """
+    def __init__(self, max_workers=2, cache=None, processes=0):
+        self.checkers = {}  # Extension -> list of `Checker` instances.
+        self.cache = cache
+        self.processes = processes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._process_pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def process_pool(self):
+        " The pool of worker processes. (Created on first use.) "
+        with self._lock:
+            if self._process_pool is None and self.processes:
+                # Don't fork: the editor runs several threads (and Qt).
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'))
+            return self._process_pool
+
+    def warm_up(self):
+        """
+        Start the worker processes in the background, so that the first
+        check doesn't wait for them.
+        """
+        pool = self.process_pool
+        if pool is not None:
+            for _ in range(self.processes):
+                pool.submit(_warm_up)
+
+    def _check(self, checker, location, document):
+        pool = self.process_pool if checker.cpu_bound else None
+        if pool is not None:
+            try:
+                errors = pool.submit(_check_in_process, checker, location,
+                                     document.text).result()
+            except (BrokenProcessPool, pickle.PicklingError):
+                pass  # Fall back to a thread.
+            else:
+                return [ReporterError.from_tuple(e) for e in errors]
+        return checker.check(location, document)
+
+    def register(self, extensions, checker):
+        " Use this checker for files with these extensions, like '.py'. "
+        for extension in extensions:
+            self.checkers.setdefault(extension.lower(), []).append(checker)
+
+    def checkers_for(self, location):
+        extension = os.path.splitext(location)[1].lower()
+        return self.checkers.get(extension, [])
+
+    def report(self, location, document, digest=None):
+        """
+        Run the checkers for this location and return the list of
+        `ReporterError` instances. (`digest` is the `text_digest` of the
+        document, if it's known already.)
+        """
+        cache = self.cache
+        if cache is not None and digest is None:
+            digest = text_digest(document.text)
+
+        errors = []
+        for checker in self.checkers_for(location):
+            use_cache = cache is not None and checker.cacheable
+            result = None
+            if use_cache:
+                result = cache.get(checker.name, digest)
+            if result is None:
+                result = self._check(checker, location, document)
+                if use_cache:
+                    cache.put(checker.name, digest, result)
+            errors.extend(result)
+        return errors
+
+    def submit(self, location, document, digest=None):
+        """
+        Run `report` in the background. Returns a
+        `concurrent.futures.Future`.
+        """
+        return self._executor.submit(self.report, location, document, digest)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+
+
+def create_default_dispatcher(cache_directory=None, processes=0):
+    """
+    Return a `ReportDispatcher` with pyflakes for Python, and Verilator for
+    Verilog and SystemVerilog files.
+
+    :param cache_directory: Directory to keep the results between sessions.
+    :param processes: Number of worker processes for pyflakes.
+    """
+    dispatcher = ReportDispatcher(cache=ReportCache(directory=cache_directory),
+                                  processes=processes)
+    dispatcher.register(['.py'], PyflakesChecker())
+    dispatcher.register(['.v', '.vh', '.sv', '.svh'], verilator_checker())
+    return dispatcher
+
+
+_default_dispatcher = None
+
 
 def report(location, document):
     """
@@ -38,11 +423,11 @@ def report(location, document):
     Returns a list of `ReporterError`.
     """
     assert isinstance(location, six.string_types)
+    global _default_dispatcher
 
-    return []
-
-
-WORD_CHARACTERS = string.ascii_letters + '0123456789_'
+    if _default_dispatcher is None:
+        _default_dispatcher = create_default_dispatcher()
+    return _default_dispatcher.report(location, document)
 
 
 def report_pyflakes(document):
@@ -53,24 +438,11 @@ def report_pyflakes(document):
     reporter = _FlakesReporter()
     pyflakes.api.check(document.text, '', reporter=reporter)
 
-    def format_flake_message(message):
-        return [
-            ('class:flakemessage.prefix', 'pyflakes:'),
-            ('', ' '),
-            ('class:flakemessage', message.message % message.message_args)
-        ]
-
     def message_to_reporter_error(message):
         """ Turn pyflakes message into ReporterError. """
-        start_index = document.translate_row_col_to_index(message.lineno - 1, message.col)
-        end_index = start_index
-        while end_index < len(document.text) and document.text[end_index] in WORD_CHARACTERS:
-            end_index += 1
-
-        return ReporterError(lineno=message.lineno - 1,
-                             start_column=message.col,
-                             end_column=message.col + end_index - start_index,
-                             formatted_text=format_flake_message(message))
+        return _reporter_error(document, message.lineno - 1, message.col,
+                               'pyflakes',
+                               message.message % message.message_args)
 
     # Construct list of ReporterError instances.
     return [message_to_reporter_error(m) for m in reporter.messages]
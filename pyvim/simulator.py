@@ -0,0 +1,291 @@
+"""
+HTTP transport between the debugger and the simulator.
+
+All requests to the simulator go through one `SimulatorClient`. It keeps a
+pooled, keep-alive `requests.Session`, so that reading hundreds of variables
+on a breakpoint doesn't open a new TCP connection for every value.
+
+Usage::
+
+    client = SimulatorClient('localhost', 8888)
+    client.detect_capabilities()
+    values = client.get_values(['TOP.a', 'TOP.b'])
+
+Protocol
+--------
+
+Besides the per-handle ``GET /value/<handle>`` call, a simulator can advertise
+extra features through ``GET /capabilities``, which returns a JSON list of
+feature names. When ``"batch"`` is in there, all values for a breakpoint are
+read with a single ``POST /value/batch`` request. Its body is a JSON list of
+handles, the response is a JSON list with one value (or ``null`` when the
+handle could not be read) for each of these handles, in the same order.
+
+When ``"condition"`` is advertised, conditional breakpoints are evaluated by
+the simulator: ``POST /breakpoint/add/<id>`` then has a JSON body with the
+``"condition"`` expression and the ``"variables"`` it uses (a mapping from
+name to handle), and the simulator only calls back when the condition holds.
+
+With ``"breakpoint_batch"``, breakpoints are added and removed in bulk:
+``POST /breakpoint/add`` and ``POST /breakpoint/remove`` take a JSON list of
+stmt ids. Otherwise every id is sent with ``/breakpoint/add/<id>`` or
+``/breakpoint/remove/<id>``.
+
+Without batch support, the values are read concurrently by a bounded pool of
+worker threads. A handle for which the simulator doesn't answer within
+`value_timeout` is reported as `TIMEOUT`, so that one slow signal doesn't
+stall the whole update.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+__all__ = (
+    'SimulatorClient',
+    'TIMEOUT',
+)
+
+
+#: Value reported for handles that didn't answer in time.
+TIMEOUT = 'TIMEOUT'
+
+
+class SimulatorClient(object):
+    """
+    Persistent connection pool to the simulator.
+
+    :param pool_size: Maximum number of keep-alive connections to the
+        simulator.
+    :param connect_timeout: Seconds to wait for a connection to be made.
+    :param read_timeout: Seconds to wait for the simulator to answer.
+    :param retries: Number of times a failed connection attempt is retried.
+        (Requests that reached the simulator are never retried, it's not safe
+        to send e.g. '/continue' twice.)
+    :param backoff_factor: Backoff between retries, see `urllib3.Retry`.
+    :param max_workers: Number of values that are read concurrently when the
+        simulator doesn't support batching. (Defaults to `pool_size`.)
+    :param value_timeout: Seconds to wait for a single value.
+    """
+    def __init__(self, hostname='localhost', port_num=8888, pool_size=10,
+                 connect_timeout=1., read_timeout=5., retries=2,
+                 backoff_factor=.1, max_workers=None, value_timeout=2.):
+        self.host_name = hostname
+        self.port_num = port_num
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.value_timeout = (connect_timeout, value_timeout)
+        self.max_workers = max_workers or pool_size
+        self._executor = None
+
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, connect=retries, read=False,
+                              status=0, redirect=0,
+                              backoff_factor=backoff_factor,
+                              raise_on_status=False))
+        self.session = requests.Session()
+        self.session.mount('http://', self._adapter)
+
+        # Features advertised by the simulator. (See `detect_capabilities`.)
+        self.capabilities = set()
+
+        # Optional callable that receives the duration of every request.
+        self.observer = None
+
+        # Counters.
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.timeout_count = 0
+
+    @property
+    def base_url(self):
+        return 'http://{0}:{1}'.format(self.host_name, self.port_num)
+
+    def _send(self, method, path, **kwargs):
+        """
+        Send a request. Raises `requests.exceptions.RequestException` on
+        failure.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self.request_count += 1
+        start = time.time()
+        try:
+            return self.session.request(method, self.base_url + path, **kwargs)
+        except requests.exceptions.RequestException as e:
+            with self._lock:
+                self.error_count += 1
+                if isinstance(e, requests.exceptions.Timeout):
+                    self.timeout_count += 1
+            raise
+        finally:
+            if self.observer is not None:
+                self.observer(time.time() - start)
+
+    def _request(self, method, path, **kwargs):
+        """
+        Send a request. Returns a `requests.Response`, or `None` when the
+        simulator could not be reached.
+        """
+        try:
+            return self._send(method, path, **kwargs)
+        except requests.exceptions.RequestException:
+            return None
+
+    def get(self, path, **kwargs):
+        return self._request('GET', path, **kwargs)
+
+    def post(self, path, data=None, **kwargs):
+        return self._request('POST', path, data=data, **kwargs)
+
+    @staticmethod
+    def ok(response):
+        " True when the request succeeded. "
+        return response is not None and response.status_code == 200
+
+    def detect_capabilities(self):
+        """
+        Ask the simulator which optional features it supports. Simulators
+        that don't know about '/capabilities' are assumed to support none.
+        """
+        r = self.get('/capabilities')
+        capabilities = set()
+        if self.ok(r):
+            try:
+                capabilities = set(r.json())
+            except (ValueError, TypeError):
+                pass
+        self.capabilities = capabilities
+        return capabilities
+
+    @property
+    def supports_batch(self):
+        return 'batch' in self.capabilities
+
+    @property
+    def supports_conditions(self):
+        return 'condition' in self.capabilities
+
+    @property
+    def supports_breakpoint_batch(self):
+        return 'breakpoint_batch' in self.capabilities
+
+    def add_breakpoints(self, stmt_ids):
+        """
+        Set breakpoints on all these statements. Returns the list of stmt ids
+        for which this succeeded.
+        """
+        return self._change_breakpoints('add', stmt_ids)
+
+    def remove_breakpoints(self, stmt_ids):
+        """
+        Remove the breakpoints of these statements. Returns the list of stmt
+        ids for which this succeeded.
+        """
+        return self._change_breakpoints('remove', stmt_ids)
+
+    def _change_breakpoints(self, action, stmt_ids):
+        stmt_ids = list(stmt_ids)
+        if not stmt_ids:
+            return []
+        if self.supports_breakpoint_batch:
+            r = self.post('/breakpoint/' + action, data=json.dumps(stmt_ids),
+                          headers={'Content-Type': 'application/json'})
+            return stmt_ids if self.ok(r) else []
+
+        def change(stmt_id):
+            return self.ok(self.post('/breakpoint/{0}/{1}'.format(
+                action, stmt_id)))
+        if len(stmt_ids) == 1 or self.max_workers <= 1:
+            results = [change(i) for i in stmt_ids]
+        else:
+            results = list(self.executor.map(change, stmt_ids))
+        return [i for i, ok in zip(stmt_ids, results) if ok]
+
+    def get_value(self, handle):
+        """
+        Read the value of one handle. Returns `None` on failure, or `TIMEOUT`
+        when the simulator didn't answer in time.
+        """
+        try:
+            r = self._send('GET', '/value/{0}'.format(handle),
+                           timeout=self.value_timeout)
+        except requests.exceptions.Timeout:
+            return TIMEOUT
+        except requests.exceptions.RequestException:
+            return None
+        if self.ok(r):
+            return r.text
+
+    def get_values(self, handles):
+        """
+        Read the values of all these handles. Returns a list, in the same
+        order as `handles`, containing `None` for every value that could not
+        be read.
+        """
+        handles = list(handles)
+        if not handles:
+            return []
+        if self.supports_batch:
+            return self._get_values_batched(handles)
+        if len(handles) == 1 or self.max_workers <= 1:
+            return [self.get_value(h) for h in handles]
+
+        # `map` yields the results in the order of `handles`.
+        return list(self.executor.map(self.get_value, handles))
+
+    @property
+    def executor(self):
+        " Thread pool for concurrent requests. (Created on first use.) "
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers)
+            return self._executor
+
+    def _get_values_batched(self, handles):
+        r = self.post('/value/batch', data=json.dumps(handles),
+                      headers={'Content-Type': 'application/json'})
+        if self.ok(r):
+            try:
+                values = r.json()
+            except ValueError:
+                values = None
+            if isinstance(values, list) and len(values) == len(handles):
+                return [None if v is None else str(v) for v in values]
+        return [None] * len(handles)
+
+    @property
+    def connection_count(self):
+        " Number of TCP connections opened to the simulator so far. "
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        """
+        Return a dictionary with the request and connection counters.
+        """
+        requests_ = self.request_count
+        connections = self.connection_count
+        reused = max(0, requests_ - self.error_count - connections)
+        return {
+            'requests': requests_,
+            'errors': self.error_count,
+            'timeouts': self.timeout_count,
+            'connections': connections,
+            'reused': reused,
+            'reuse_rate': (float(reused) / requests_) if requests_ else 0.,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
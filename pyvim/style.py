@@ -91,6 +91,11 @@ style_extensions = {
     # Soft wrap.
     'soft-wrap':                          '#888888',
 
+    # Breakpoint margin.
+    'breakpoint-margin':                  '#888888',
+    'breakpoint-margin.active':           '#ff4444 bold',
+    'current-stop':                       'bg:#444400',
+
     # Directory listing style.
     'pygments.directorylisting.header':    '#4444ff',
     'pygments.directorylisting.directory': '#ff4444 bold',
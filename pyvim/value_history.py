@@ -0,0 +1,157 @@
+"""
+History of the values read at each breakpoint hit.
+
+Every time the simulator stops, the values of the statement's variables are
+recorded under (stmt id, hit number), where the hit number counts how many
+times this statement was hit. This way earlier iterations of a loop can be
+displayed and compared without asking the simulator again.
+
+The values of one hit are packed in a single string with an array of
+offsets. When the history becomes too large, the oldest hits are evicted
+first.
+
+Usage::
+
+    history = ValueHistory(max_entries=1000)
+    hit = history.record(stmt_id, handles, values)
+    history.get(stmt_id, hit)
+"""
+from __future__ import unicode_literals
+
+from array import array
+from collections import OrderedDict
+import threading
+
+__all__ = (
+    'ValueHistory',
+)
+
+
+class _Entry(object):
+    """
+    The values of one breakpoint hit.
+    """
+    __slots__ = ('handles', 'blob', 'offsets', 'known')
+
+    def __init__(self, handles, values):
+        self.handles = handles  # Shared with the handle cache.
+        self.pack(values)
+
+    def pack(self, values):
+        known = bytearray(len(values))
+        offsets = array('l', [0])
+        parts = []
+        pos = 0
+        for i, value in enumerate(values):
+            if value is not None:
+                known[i] = 1
+                parts.append(value)
+                pos += len(value)
+            offsets.append(pos)
+
+        self.blob = ''.join(parts)
+        self.offsets = offsets
+        self.known = known
+
+    def values(self):
+        blob = self.blob
+        offsets = self.offsets
+        return [blob[offsets[i]:offsets[i + 1]] if k else None
+                for i, k in enumerate(self.known)]
+
+    @property
+    def size(self):
+        " Approximate memory use, in bytes. "
+        return (len(self.blob) + len(self.known) +
+                len(self.offsets) * self.offsets.itemsize)
+
+
+class ValueHistory(object):
+    """
+    Bounded store of breakpoint values.
+
+    :param max_entries: Maximum number of hits to keep.
+    :param max_size: Maximum size of all the stored values, in bytes.
+    """
+    def __init__(self, max_entries=1000, max_size=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+
+        self._entries = OrderedDict()  # (stmt_id, hit) -> _Entry
+        self._hit_counts = {}  # stmt_id -> number of hits
+        self._lock = threading.Lock()
+        self.size = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, stmt_id, handles, values):
+        """
+        Record the values of a new hit of this statement. (Values that are not
+        known yet can be `None`, and filled in later using `update`.)
+        Returns the hit number.
+        """
+        entry = _Entry(handles, values)
+        with self._lock:
+            hit = self._hit_counts.get(stmt_id, 0) + 1
+            self._hit_counts[stmt_id] = hit
+            self._entries[(stmt_id, hit)] = entry
+            self.size += entry.size
+            self._evict()
+        return hit
+
+    def update(self, stmt_id, hit, rows, values):
+        """
+        Fill in the values of these rows for an earlier recorded hit.
+        """
+        with self._lock:
+            entry = self._entries.get((stmt_id, hit))
+            if entry is None:
+                return
+            all_values = entry.values()
+            for row, value in zip(rows, values):
+                all_values[row] = value
+            self.size -= entry.size
+            entry.pack(all_values)
+            self.size += entry.size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self.size > self.max_size):
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self.evicted += 1
+
+    def get(self, stmt_id, hit):
+        """
+        Return the list of values of this hit, or `None` when it's not in the
+        history (anymore).
+        """
+        entry = self._entries.get((stmt_id, hit))
+        if entry is not None:
+            return entry.values()
+
+    def hit_count(self, stmt_id):
+        " Number of times this statement was hit. "
+        return self._hit_counts.get(stmt_id, 0)
+
+    def hits(self, stmt_id):
+        " Return the hit numbers of this statement that are still stored. "
+        with self._lock:
+            return [hit for (id_, hit) in self._entries if id_ == stmt_id]
+
+    def diff(self, stmt_id, hit_a, hit_b):
+        """
+        Compare two hits of a statement. Returns a list of (row, value_a,
+        value_b) tuples for the values that differ, or `None` when one of the
+        hits is not available.
+        """
+        a = self.get(stmt_id, hit_a)
+        b = self.get(stmt_id, hit_b)
+        if a is None or b is None:
+            return None
+        return [(row, value_a, value_b)
+                for row, (value_a, value_b) in enumerate(zip(a, b))
+                if value_a != value_b]
@@ -0,0 +1,299 @@
+"""
+The variable watcher window.
+
+The watcher shows the design variables of the current breakpoint in a
+`QTableView`, backed by `WatcherModel`. The model doesn't create an item per
+cell: the names are the tuple kept by the handle cache, the values a plain
+list and the "changed" flags a `bytearray`. Filtering and sorting only
+compute an array of row indices. Values sort as numbers when they are numbers
+(also hex and Verilog literals), and the values that are not fetched yet
+stay at the end in both orders.
+
+Values that are not known yet are displayed as a placeholder. The first time
+Qt asks for such a value (which only happens for rows in the viewport), the
+model emits `fetch_requested`, so that the debugger reads just these values
+from the simulator. Rows can also be expanded explicitly: double clicking a
+row, or the "Fetch all" button, requests the values of those rows.
+"""
+from array import array
+
+from PyQt5.QtWidgets import QWidget, QTableView, QHeaderView, QLineEdit,\
+    QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from PyQt5.QtCore import pyqtSignal, Qt, QAbstractTableModel, QTimer
+from PyQt5.QtGui import QBrush, QColor
+
+from .breakpoint_condition import to_number
+
+__all__ = (
+    'WatcherModel',
+    'ValueWatcher',
+)
+
+
+def _value_key(value):
+    " Sort key for a value: numbers by value, before the other values. "
+    number = to_number(value)
+    if isinstance(number, str):
+        return (1, 0, value)
+    return (0, number, "")
+
+
+class WatcherModel(QAbstractTableModel):
+    """
+    Table model with a "Variable" and a "Value" column.
+    """
+    # (generation, source rows): these values are needed for display
+    fetch_requested = pyqtSignal(int, object)
+    # (generation): the rows of this breakpoint hit are applied
+    rows_updated = pyqtSignal(int)
+
+    placeholder = "..."
+    headers = ("Variable", "Value")
+    changed_brush = QBrush(QColor(255, 230, 150))
+
+    def __init__(self, highlight_changes=True, parent=None):
+        super().__init__(parent)
+        self.highlight_changes = highlight_changes
+
+        # every breakpoint hit gets a new generation number, results for
+        # older generations are ignored
+        self.generation = -1
+
+        self._names = ()
+        self._values = []  # None for values that are not fetched yet
+        self._changed = bytearray()
+        self._requested = bytearray()
+        self._pending = set()
+
+        # visible row -> source row, None when not filtered or sorted
+        self._rows = None
+        self._filter = ""
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    # storage
+
+    def set_rows(self, generation, names, values, changed):
+        """
+        Show a new breakpoint: the variable names and their values. (`None`
+        for values that should be fetched on demand.)
+        """
+        same_names = names == self._names
+        if not same_names:
+            self.beginResetModel()
+
+        self.generation = generation
+        self._names = names
+        self._values = values
+        self._changed = bytearray(len(names))
+        for row in changed:
+            self._changed[row] = 1
+        self._requested = bytearray(len(names))
+        self._pending.clear()
+
+        if same_names:
+            # keep the scroll position and selection
+            self._values_changed()
+        else:
+            self._rows = self._compute_rows()
+            self.endResetModel()
+        self.rows_updated.emit(generation)
+
+    def update_changed(self, generation, cells):
+        """
+        Show a new breakpoint for the same variables as the current one.
+        `cells` are the (row, value) pairs that changed, all the other values
+        stay the same.
+        """
+        self.generation = generation
+        self._changed = bytearray(len(self._names))
+        for row, value in cells:
+            self._values[row] = value
+            self._changed[row] = 1
+        self._values_changed()
+        self.rows_updated.emit(generation)
+
+    def set_values(self, generation, cells):
+        """
+        Fill in values that were fetched on demand. `cells` is a list of
+        (row, value, changed) tuples.
+        """
+        if generation != self.generation:
+            return
+        for row, value, changed in cells:
+            self._values[row] = value
+            self._changed[row] = changed
+        self._values_changed()
+
+    def _values_changed(self):
+        if self._sort_column == 1:
+            self._relayout()
+        elif self.rowCount():
+            self.dataChanged.emit(self.index(0, 1),
+                                  self.index(self.rowCount() - 1, 1))
+
+    def _source_row(self, row):
+        return row if self._rows is None else self._rows[row]
+
+    def _compute_rows(self):
+        rows = None
+        if self._filter:
+            text = self._filter.lower()
+            rows = array("l", (i for i, name in enumerate(self._names)
+                               if text in name.lower()))
+        if self._sort_column in (0, 1):
+            if rows is None:
+                rows = range(len(self._names))
+            reverse = self._sort_order == Qt.DescendingOrder
+            if self._sort_column == 0:
+                rows = sorted(rows, key=self._names.__getitem__,
+                              reverse=reverse)
+            else:
+                values = self._values
+                rows = sorted(
+                    (i for i in rows if values[i] is not None),
+                    key=lambda i: _value_key(values[i]),
+                    reverse=reverse) + [i for i in rows if values[i] is None]
+            rows = array("l", rows)
+        return rows
+
+    def _relayout(self):
+        self.layoutAboutToBeChanged.emit()
+        self._rows = self._compute_rows()
+        self.layoutChanged.emit()
+
+    def set_filter(self, text):
+        self.beginResetModel()
+        self._filter = text
+        self._rows = self._compute_rows()
+        self.endResetModel()
+
+    # on demand fetching
+
+    def _request(self, row):
+        if not self._requested[row]:
+            self._requested[row] = 1
+            if not self._pending:
+                # collect all the rows of this paint event in one request
+                QTimer.singleShot(0, self._flush_requests)
+            self._pending.add(row)
+
+    def fetch_rows(self, rows):
+        """
+        Request the values of these (visible) rows, if they are not known yet.
+        """
+        for row in rows:
+            row = self._source_row(row)
+            if self._values[row] is None:
+                self._request(row)
+
+    def _flush_requests(self):
+        if self._pending:
+            rows = sorted(self._pending)
+            self._pending.clear()
+            self.fetch_requested.emit(self.generation, rows)
+
+    # QAbstractTableModel
+
+    def rowCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self._names) if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
+        return 2
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._source_row(index.row())
+
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return self._names[row]
+            value = self._values[row]
+            if value is None:
+                self._request(row)
+                return self.placeholder
+            return value
+
+        if role == Qt.BackgroundRole and index.column() == 1:
+            if self.highlight_changes and self._changed[row]:
+                return self.changed_brush
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._relayout()
+
+
+class ValueWatcher(QWidget):
+    # (generation, names, values, changed rows): a breakpoint was hit
+    update_signal = pyqtSignal(int, object, object, object)
+    # (generation, [(row, value)]): same variables, only these changed
+    update_cells = pyqtSignal(int, object)
+    # (generation, [(row, value, changed)]): values fetched on demand
+    update_values = pyqtSignal(int, object)
+    update_label = pyqtSignal(str)
+
+    def __init__(self, editor, highlight_changes=True):
+        super().__init__()
+
+        self.setWindowTitle("Variable Watcher")
+        self.setGeometry(0, 0, 300, 200)
+
+        self.model = WatcherModel(highlight_changes)
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Filter variables")
+        self.fetch_all = QPushButton("Fetch all")
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # no sorting until a header is clicked
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        self.label = QLabel()
+        self.label.setText("Current Breakpoint:")
+        self.toolbar = QHBoxLayout()
+        self.toolbar.addWidget(self.filter)
+        self.toolbar.addWidget(self.fetch_all)
+        self.layout = QVBoxLayout()
+        self.layout.addLayout(self.toolbar)
+        self.layout.addWidget(self.table)
+        self.layout.addWidget(self.label)
+        self.setLayout(self.layout)
+
+        self.editor = editor
+
+        self.update_signal.connect(self.model.set_rows)
+        self.update_cells.connect(self.model.update_changed)
+        self.update_values.connect(self.model.set_values)
+        self.update_label.connect(self.handle_text_update)
+        self.filter.textChanged.connect(self.model.set_filter)
+        self.table.doubleClicked.connect(
+            lambda index: self.model.fetch_rows([index.row()]))
+        self.fetch_all.clicked.connect(
+            lambda: self.model.fetch_rows(range(self.model.rowCount())))
+        self.show()
+
+    @property
+    def highlight_changes(self):
+        return self.model.highlight_changes
+
+    @highlight_changes.setter
+    def highlight_changes(self, value):
+        self.model.highlight_changes = value
+        self.table.viewport().update()
+
+    def handle_text_update(self, value):
+        self.label.setText("Current Breakpoint: " + value)
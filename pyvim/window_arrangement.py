@@ -390,6 +390,10 @@ class WindowArrangement(object):
                 index = 0
             self.editor_buffers.insert(index, editor_buffer)
 
+        # Breakpoint lines for the margin.
+        if editor_buffer.location:
+            self.editor.debugger.file_opened(editor_buffer.location)
+
         # When there are no tabs/windows yet, create one for this buffer.
         if self.tab_pages == []:
             self.tab_pages.append(TabPage(Window(editor_buffer)))
@@ -399,8 +403,8 @@ class WindowArrangement(object):
         if show_in_current_window and self.active_tab:
             self.active_tab.show_editor_buffer(editor_buffer)
 
-        # Start reporter.
-        editor_buffer.run_reporter()
+        # Start reporter. (Right away, the results can be cached.)
+        editor_buffer.run_reporter(delay=0)
 
     def _get_or_create_editor_buffer(self, location=None, text=None):
         """
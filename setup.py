@@ -17,13 +17,15 @@ setup(
     long_description=long_description,
     packages=find_packages('.'),
     install_requires = [
-        'prompt_toolkit>=2.0.0,<3.1.0',
+        'prompt_toolkit>=3.0.0,<3.1.0',
         'pyflakes',        # For Python error reporting.
         'pygments',        # For the syntax highlighting.
         'docopt',          # For command line arguments.
         'requests',        # For debugger interface
-        'flask',           # For debugger interface
     ],
+    extras_require={
+        'flask': ['flask'],  # For the Flask based debugger callback server.
+    },
     entry_points={
         'console_scripts': [
             'pyvim = pyvim.entry_points.run_pyvim:run',
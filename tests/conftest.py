@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
 
+import os
+import sqlite3
+
 import pytest
 
 from prompt_toolkit.buffer import Buffer
@@ -9,9 +12,36 @@ from pyvim.editor import Editor
 from pyvim.window_arrangement import TabPage, EditorBuffer, Window
 
 
+@pytest.fixture(scope='session')
+def qt_app():
+    # The watcher is a Qt widget, run it without a display.
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def database(tmpdir):
+    " An empty debug database. "
+    filename = str(tmpdir.join('debug.db'))
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE breakpoint (id INTEGER, filename TEXT, '
+                 'line_num INTEGER)')
+    conn.execute('CREATE TABLE variable (handle TEXT, var TEXT, '
+                 'front_var TEXT, id INTEGER)')
+    conn.commit()
+    conn.close()
+    return filename
+
+
 @pytest.fixture
-def editor():
-    return Editor(output=DummyOutput(), input=DummyInput())
+def editor(qt_app, database, tmpdir):
+    editor = Editor(database, config_directory=str(tmpdir.join('config')),
+                    output=DummyOutput(), input=DummyInput(),
+                    report_processes=0)
+    yield editor
+    editor.debugger.stop()
+    editor.reporter.shutdown()
 
 
 @pytest.fixture
@@ -0,0 +1,68 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from pyvim.breakpoint_condition import BreakpointCondition, to_number
+
+
+VARIABLES = {
+    'count': 'TOP.mod.count',
+    'self.valid': 'TOP.mod.valid',
+    'data': 'TOP.mod.data',
+}
+
+
+def test_only_used_handles():
+    c = BreakpointCondition('count > 3 and count < 10', VARIABLES)
+    assert c.handles == ('TOP.mod.count', )
+    assert c.variables == {'count': 'TOP.mod.count'}
+
+
+def test_evaluate():
+    c = BreakpointCondition('count > 3 and self.valid', VARIABLES)
+    assert c.handles == ('TOP.mod.count', 'TOP.mod.valid')
+    assert c.evaluate(['4', '1'])
+    assert not c.evaluate(['4', '0'])
+    assert not c.evaluate(['2', '1'])
+
+
+def test_to_number():
+    assert to_number('12') == 12
+    assert to_number('0x1f') == 31
+    assert to_number("8'hff") == 255
+    assert to_number("4'b1010") == 10
+    assert to_number('1.5') == 1.5
+    assert to_number('x') == 'x'
+
+
+def test_string_values():
+    c = BreakpointCondition('data == "xx"', VARIABLES)
+    assert c.evaluate(['xx'])
+    assert not c.evaluate(['10'])
+
+
+@pytest.mark.parametrize('expression', [
+    'unknown > 1',
+    '__import__("os")',
+    'count.__class__',
+    '[count]',
+    'lambda: count',
+    'count ** 10 ** 10',
+])
+def test_invalid(expression):
+    with pytest.raises(ValueError):
+        BreakpointCondition(expression, VARIABLES)
+
+
+def test_no_huge_results():
+    # These would block the debugger on every hit.
+    for expression, values in [('count << 99999999999', ['3']),
+                               ('data * 99999999999 == ""', ['ab']),
+                               ('(count << 4000) * (count << 4000)', ['3'])]:
+        c = BreakpointCondition(expression, VARIABLES)
+        with pytest.raises(ValueError):
+            c.evaluate(values)
+
+    c = BreakpointCondition('count << 4 == 48 and data * 2 == "abab"',
+                            VARIABLES)
+    assert c.evaluate(['3', 'ab'])
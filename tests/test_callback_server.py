@@ -0,0 +1,43 @@
+from __future__ import unicode_literals
+
+import pytest
+import requests
+
+from pyvim.callback_server import create_callback_server
+
+
+@pytest.fixture
+def hits():
+    return []
+
+
+@pytest.fixture
+def server(hits):
+    server = create_callback_server('builtin', hits.append, host='127.0.0.1',
+                                    port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _url(server, path):
+    return 'http://127.0.0.1:%i%s' % (server.server_port, path)
+
+
+def test_breakpoint_callback(server, hits):
+    r = requests.post(_url(server, '/status/breakpoint'), data='42')
+    assert r.status_code == 200
+    assert r.text == 'Okay'
+    assert hits == [42]
+
+
+def test_invalid_requests(server, hits):
+    assert requests.post(_url(server, '/other'), data='1').status_code == 404
+    assert requests.post(_url(server, '/status/breakpoint'),
+                         data='x').status_code == 400
+    assert hits == []
+
+
+def test_unknown_server():
+    with pytest.raises(ValueError):
+        create_callback_server('unknown', None)
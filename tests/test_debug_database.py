@@ -0,0 +1,132 @@
+from __future__ import unicode_literals
+
+import sqlite3
+import threading
+
+import pytest
+
+from pyvim.debug_database import DebugDatabase, ResolvedHandleCache
+
+
+BREAKPOINTS = [
+    (1, '/src/a.py', 10),
+    (2, '/src/a.py', 3),
+    (3, '/src/b.py', 7),
+    (4, '/src/a.py', 20),
+    (5, '/src/a.py', 20),  # Two statements on one line.
+]
+
+VARIABLES = [
+    ('mod', 'x', 'x', 1),
+    ('TOP.mod', 'y', 'self.y', 1),
+    ('mod', 'z', 'z', 3),
+]
+
+
+@pytest.fixture
+def database(tmpdir):
+    filename = str(tmpdir.join('debug.db'))
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE breakpoint (id INTEGER, filename TEXT, '
+                 'line_num INTEGER)')
+    conn.execute('CREATE TABLE variable (handle TEXT, var TEXT, '
+                 'front_var TEXT, id INTEGER)')
+    conn.executemany('INSERT INTO breakpoint VALUES (?, ?, ?)', BREAKPOINTS)
+    conn.executemany('INSERT INTO variable VALUES (?, ?, ?, ?)', VARIABLES)
+    conn.commit()
+    conn.close()
+    return filename
+
+
+@pytest.fixture(params=[False, True], ids=['eager', 'lazy'])
+def db(request, database):
+    return DebugDatabase(database, lazy=request.param)
+
+
+def test_files(db):
+    assert db.files() == ['/src/a.py', '/src/b.py']
+
+
+def test_breakpoint_lines(db):
+    assert list(db.breakpoint_lines('/src/a.py')) == [3, 10, 20]
+
+
+def test_stmt_ids_in_range(db):
+    assert db.stmt_ids_in_range('/src/a.py', 4, 20) == [1, 4, 5]
+    assert db.stmt_ids_in_range('/src/a.py', 3, 3) == [2]
+    assert db.stmt_ids_in_range('/src/a.py', 11, 19) == []
+    assert db.stmt_ids_in_range('/src/a.py') == [2, 1, 4, 5]
+    assert db.stmt_ids_in_range('/src/c.py') == []
+    assert list(db.breakpoint_lines('/src/unknown.py')) == []
+    assert db.has_breakpoint('/src/b.py', 7)
+    assert not db.has_breakpoint('/src/b.py', 8)
+
+
+def test_stmt_id(db):
+    assert db.stmt_id('/src/a.py', 10) == 1
+    assert db.stmt_id('/src/a.py', 11) is None
+    assert db.stmt_id('/src/a.py', 20) is None  # Ambiguous.
+
+
+def test_location(db):
+    assert db.location(3) == ('/src/b.py', 7)
+    assert db.location(42) is None
+
+
+def test_variables(db):
+    assert db.variables(1) == (('mod', 'x', 'x'), ('TOP.mod', 'y', 'self.y'))
+    assert db.variables(2) == ()
+
+
+def test_read_only_connection_per_thread(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.conn.execute('DELETE FROM breakpoint')
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.conn))
+    thread.start()
+    thread.join()
+    assert other[0] is not db.conn
+    db.close()
+
+
+def test_missing_indexes_warning(database):
+    db = DebugDatabase(database, lazy=True)
+    assert db.full_scans() == ['file_breakpoints', 'location', 'variables']
+    assert db.warnings
+
+
+def test_index_cache(database, tmpdir):
+    directory = str(tmpdir.join('index'))
+    db = DebugDatabase(database, lazy=True, index_directory=directory)
+    assert db.query_filename != db.filename
+    assert db.full_scans() == []
+    assert db.warnings == []
+    assert db.location(3) == ('/src/b.py', 7)
+    assert db.stmt_id('/src/a.py', 10) == 1
+
+    # The input is not modified, and the indexed copy is reused.
+    assert DebugDatabase(database, lazy=True).full_scans()
+    again = DebugDatabase(database, lazy=True, index_directory=directory)
+    assert again.query_filename == db.query_filename
+
+
+def test_resolved_handles(db):
+    cache = ResolvedHandleCache(db)
+    handles, names = cache.get(1)
+    assert handles == ('TOP.mod.x', 'TOP.mod.y')
+    assert names == ('x', 'self.y')
+
+    assert cache.get(1) is cache.get(1)
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 1
+
+
+def test_resolved_handles_top_change(db):
+    cache = ResolvedHandleCache(db, eager=True)
+    assert cache.get(3) == (('TOP.mod.z',), ('z',))
+    assert cache.hits == 1
+
+    cache.top = 'DUT'
+    assert cache.get(3) == (('DUT.mod.z',), ('z',))
+    assert cache.misses == 1
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import json
+
+from pyvim.debug_metrics import DebugMetrics, Histogram
+
+
+def test_bucket_placement():
+    h = Histogram(min_value=1., bucket_count=4)
+    assert h.bounds == [1., 2., 4., 8.]
+    for value in (.5, 1., 1.5, 8., 9.):
+        h.observe(value)
+
+    # Bucket `i` counts the values up to bounds[i], the last one the rest.
+    assert h.counts == [2, 1, 0, 1, 1]
+    assert (h.count, h.min, h.max) == (5, .5, 9.)
+
+
+def test_percentiles():
+    h = Histogram(min_value=1., bucket_count=4)
+    assert h.percentile(50) == 0.
+
+    for _ in range(90):
+        h.observe(1.5)
+    for _ in range(10):
+        h.observe(6.)
+
+    assert h.percentile(50) == 2.  # Upper bound of the bucket.
+    assert h.percentile(99) == 6.  # Not above the largest value.
+    assert h.mean == (90 * 1.5 + 10 * 6.) / 100
+
+
+def test_dump(tmpdir):
+    metrics = DebugMetrics()
+    metrics.observe('http', .001)
+    metrics.observe('http', .003)
+    metrics.hit(7)
+    metrics.hit(7)
+
+    filename = str(tmpdir.join('metrics.json'))
+    metrics.dump(filename, extra={'simulator': 'fake'})
+    with open(filename) as f:
+        data = json.load(f)
+
+    assert data == json.loads(json.dumps(dict(
+        metrics.to_dict(), simulator='fake')))
+    assert data['hits'] == {'7': 2}
+    assert data['phases']['http']['count'] == 2
+    assert data['phases']['lookup']['count'] == 0
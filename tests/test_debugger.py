@@ -0,0 +1,280 @@
+from __future__ import unicode_literals
+
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from pyvim.debugger import BreakpointQueue, Debugger
+from pyvim.fake_simulator import FakeSimulator
+
+
+class FakeEditor(object):
+    " The part of the editor that the debugger uses. "
+    def __init__(self):
+        self.messages = []
+        self.calls = []  # Not run: there is no event loop.
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+    def invalidate(self):
+        pass
+
+    def call_in_loop(self, func, key=None):
+        self.calls.append(func)
+
+
+VALUES = dict(('TOP.mod.sig%i' % i, i) for i in range(200))
+VALUES.update({'TOP.mod.count': 5, 'TOP.mod.valid': 1})
+
+
+def wait_for(predicate, timeout=5, qt_app=None):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, 'timed out'
+        if qt_app is not None:
+            qt_app.processEvents()  # Deliver the signals of other threads.
+        time.sleep(.01)
+
+
+@pytest.fixture
+def source(tmpdir):
+    return str(tmpdir.join('a.py'))
+
+
+@pytest.fixture
+def database(tmpdir, source):
+    # Statement 1 (line 3) has two variables, statement 2 (line 5) has 200.
+    filename = str(tmpdir.join('debug.db'))
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE breakpoint (id INTEGER, filename TEXT, '
+                 'line_num INTEGER)')
+    conn.execute('CREATE TABLE variable (handle TEXT, var TEXT, '
+                 'front_var TEXT, id INTEGER)')
+    conn.executemany('INSERT INTO breakpoint VALUES (?, ?, ?)',
+                     [(1, source, 3), (2, source, 5)])
+    conn.executemany('INSERT INTO variable VALUES (?, ?, ?, ?)',
+                     [('mod', 'count', 'count', 1),
+                      ('mod', 'valid', 'self.valid', 1)] +
+                     [('mod', 'sig%i' % i, 'sig%i' % i, 2)
+                      for i in range(200)])
+    conn.commit()
+    conn.close()
+    return filename
+
+
+@pytest.fixture
+def create_debugger(qt_app, database):
+    debuggers = []
+
+    def create(port, **kwargs):
+        kwargs.setdefault('connect_delay', .01)
+        debugger = Debugger(FakeEditor(), hostname='127.0.0.1', port_num=port,
+                            database=database, **kwargs)
+        debuggers.append(debugger)
+        return debugger
+
+    yield create
+    for debugger in debuggers:
+        debugger.stop()
+
+
+def test_breakpoint_queue_drops_stale_hits():
+    queue = BreakpointQueue()
+    queue.put(1)
+    queue.put(2)
+    queue.put(3)
+
+    assert queue.get()[0] == 3
+    assert queue.dropped == 2
+
+
+def test_breakpoint_queue_close_wakes_consumer():
+    queue = BreakpointQueue()
+    result = []
+
+    t = threading.Thread(target=lambda: result.append(queue.get()))
+    t.start()
+    queue.close()
+    t.join(1)
+
+    assert result == [(None, None)]
+
+
+def test_condition_is_sent_to_simulator(create_debugger, source):
+    sim = FakeSimulator(VALUES, conditions=True).start()
+    try:
+        debugger = create_debugger(sim.port)
+        wait_for(lambda: debugger.connected)
+        debugger.set_break_point(source, 3, 'count > 3 and self.valid')
+
+        assert sim.breakpoints == set([1])
+        assert sim.breakpoint_conditions[1] == {
+            'condition': 'count > 3 and self.valid',
+            'variables': {'count': 'TOP.mod.count',
+                          'self.valid': 'TOP.mod.valid'}}
+        assert debugger.conditions == {}
+        assert debugger.active_breakpoints == set([1])
+    finally:
+        sim.stop()
+
+
+def test_lazy_values(create_debugger, qt_app):
+    sim = FakeSimulator(VALUES).start()
+    try:
+        debugger = create_debugger(sim.port, lazy_values=True)
+        debugger.watcher.hide()  # Only the requests of this test.
+        model = debugger.watcher.model
+        wait_for(lambda: debugger.connected)
+
+        # Nothing is read when the breakpoint is hit.
+        del sim.requests[:]
+        debugger.update(2)
+        assert model.rowCount() == 200 and model._values == [None] * 200
+        assert sim.requests == []
+
+        # The rows the watcher asks for are read in chunks.
+        debugger._fetch_requested(model.generation, list(range(150)))
+        wait_for(lambda: model._values[149] is not None, qt_app=qt_app)
+        assert model._values[:150] == [str(i) for i in range(150)]
+        assert model._values[150:] == [None] * 50
+        assert sim.requests == [('POST', '/value/batch')] * 3
+
+        # The next hit cancels the fetches that didn't start, and the
+        # values of the fetch that was running are ignored.
+        sim.latency = .2
+        debugger.fetch_chunk_size = 10
+        debugger._fetch_requested(model.generation, list(range(150, 200)))
+        time.sleep(.05)
+        debugger.update(1)
+        assert debugger.cancelled_fetches == 4
+
+        debugger._fetch_executor.submit(lambda: None).result()
+        qt_app.processEvents()
+        assert model.rowCount() == 2 and model._values == [None, None]
+    finally:
+        sim.stop()
+
+
+def test_margin_lines_without_database(create_debugger, source):
+    sim = FakeSimulator(VALUES).start()
+    try:
+        debugger = create_debugger(sim.port, lazy_database=True)
+        wait_for(lambda: debugger.connected)
+        debugger.file_opened(source)
+        debugger.set_break_points(source, 4, 5)
+        debugger.set_break_point(source, 3)
+
+        # Rendering the margin doesn't run any query.
+        queries = []
+        debugger.db._query = lambda *a: queries.append(a)
+        assert debugger.margin_lines(source) == (frozenset([3, 5]),
+                                                 frozenset([3, 5]))
+        debugger.clear_break_points()
+        assert debugger.margin_lines(source) == (frozenset([3, 5]),
+                                                 frozenset())
+        assert debugger.margin_lines('other.py') == (frozenset(),
+                                                     frozenset())
+        assert queries == []
+    finally:
+        sim.stop()
+
+
+def free_port():
+    " A port on which nothing listens yet. "
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def test_connect_in_background(create_debugger, source):
+    port = free_port()
+    debugger = create_debugger(port, max_connect_delay=.05)
+    wait_for(lambda: debugger.connect_attempts >= 2)
+    assert debugger.connection_state.startswith('waiting')
+
+    # Commands are queued until the simulator answers, continue is refused.
+    debugger.set_break_point(source, 3)
+    debugger.continue_()
+    assert debugger.editor.messages[-2:] == [
+        'Simulator not connected yet, command queued',
+        'Simulator not connected yet']
+
+    sim = FakeSimulator(VALUES, port=port).start()
+    try:
+        wait_for(lambda: debugger.connected)
+        wait_for(lambda: sim.breakpoints == set([1]))
+        assert debugger.connection_state == 'connected'
+        assert sim.continue_count == 0
+        wait_for(lambda: debugger.editor.messages[-1] ==
+                 'Connected to simulator, 1 queued commands sent')
+    finally:
+        sim.stop()
+
+
+def test_condition_is_evaluated_locally(create_debugger, source):
+    sim = FakeSimulator(dict(VALUES), conditions=False).start()
+    try:
+        debugger = create_debugger(sim.port)
+        wait_for(lambda: debugger.connected)
+        debugger.set_break_point(source, 3, 'count > 3 and self.valid')
+        assert sim.breakpoint_conditions == {}
+        assert list(debugger.conditions) == [1]
+
+        # False: continue without stopping.
+        sim.values['TOP.mod.count'] = 2
+        debugger.update(1)
+        assert (debugger.skipped_hits, sim.continue_count) == (1, 1)
+        assert debugger.current_stop is None
+
+        # True: stop.
+        sim.values['TOP.mod.count'] = 4
+        debugger.update(1)
+        assert (debugger.skipped_hits, sim.continue_count) == (1, 1)
+        assert debugger.current_stop[0] == 1
+    finally:
+        sim.stop()
+
+
+def test_queued_commands_run_first(create_debugger):
+    port = free_port()
+    debugger = create_debugger(port, max_connect_delay=.05)
+    order = []
+
+    def queued():
+        # A command given while the queue runs waits for its turn.
+        order.append('queued')
+        debugger._when_connected(lambda: order.append('new'))
+        order.append('queued done')
+
+    debugger._when_connected(queued)
+    sim = FakeSimulator(VALUES, port=port).start()
+    try:
+        wait_for(lambda: debugger.connected)
+        assert order == ['queued', 'queued done', 'new']
+    finally:
+        sim.stop()
+
+
+def test_eager_stop_after_lazy_stop(create_debugger):
+    sim = FakeSimulator(VALUES).start()
+    try:
+        debugger = create_debugger(sim.port, lazy_values=True)
+        debugger.watcher.hide()
+        model = debugger.watcher.model
+        wait_for(lambda: debugger.connected)
+        debugger.update(2)
+        assert model._values[-1] is None
+
+        # Same variables, but not all of them were shown: send them all.
+        debugger.lazy_values = False
+        debugger.update(2)
+        assert None not in model._values
+        assert model._values[-1] == '199'
+    finally:
+        sim.stop()
@@ -0,0 +1,103 @@
+from __future__ import unicode_literals
+
+import time
+
+from prompt_toolkit.layout.processors import TransformationInput
+
+from pyvim.editor import _auto_refresh_context
+from pyvim.layout import CurrentStopProcessor
+
+
+class FakeLoop(object):
+    def __init__(self):
+        self.scheduled = []
+
+    def call_soon_threadsafe(self, func):
+        self.scheduled.append(func)
+
+
+def test_call_in_loop_coalesces(editor, monkeypatch):
+    # Pretend that the application runs, with a loop that runs nothing yet.
+    app = editor.application
+    loop = FakeLoop()
+    monkeypatch.setattr(app, '_is_running', True)
+    monkeypatch.setattr(app, 'loop', loop)
+    monkeypatch.setattr(app, 'invalidate', lambda: None)
+
+    calls = []
+    editor.call_in_loop(lambda: calls.append(1), key='stop')
+    editor.call_in_loop(lambda: calls.append(2), key='stop')
+    editor.call_in_loop(lambda: calls.append(3))
+    assert calls == [] and len(loop.scheduled) == 1
+
+    loop.scheduled[0]()
+    assert calls == [2, 3]
+
+
+def test_show_stop(editor, tmpdir):
+    source = tmpdir.join('a.py')
+    source.write('a = 1\nb = 2\nc = 3\n')
+    other = tmpdir.join('b.py')
+    other.write('d = 4\n')
+    editor.load_initial_files([str(other)])
+    wa = editor.window_arrangement
+
+    # Opens the file and moves the cursor to the line.
+    editor.debugger.stop_location = (str(source), 3)
+    editor.debugger._show_stop()
+    eb = wa.active_editor_buffer
+    assert eb.location == str(source)
+    assert eb.buffer.document.cursor_position_row == 2
+
+    # Shows the buffer again when another one became visible.
+    wa.show_editor_buffer(wa.open_buffer(str(other)))
+    editor.debugger.stop_location = (str(source), 2)
+    editor.debugger._show_stop()
+    assert wa.active_editor_buffer is eb
+    assert eb.buffer.document.cursor_position_row == 1
+    assert len(wa.editor_buffers) == 2
+
+
+def test_current_stop_processor(editor, tmpdir):
+    source = tmpdir.join('a.py')
+    source.write('a = 1\nb = 2\n')
+    editor.load_initial_files([str(source)])
+    eb = editor.window_arrangement.active_editor_buffer
+    processor = CurrentStopProcessor(editor, eb)
+    editor.debugger.stop_location = (str(source), 2)
+
+    def transform(lineno):
+        ti = TransformationInput(None, eb.buffer.document, lineno,
+                                 lambda i: i, [('', 'x')], 10, 1)
+        return processor.apply_transformation(ti).fragments
+
+    assert transform(0) == [('', 'x')]
+    assert transform(1) == [(' class:current-stop', 'x')]
+
+
+def test_auto_refresh_only_redraws_when_needed(editor, monkeypatch):
+    app = editor.application
+    redraws = []
+    monkeypatch.setattr(app, '_is_running', True)
+    monkeypatch.setattr(app, 'invalidate', lambda: redraws.append(1))
+    editor._dirty = False
+    editor.refresh_interval = .01
+
+    with _auto_refresh_context(editor):
+        # The first check sees the terminal size, then nothing changes.
+        time.sleep(.2)
+        assert len(redraws) == 1
+
+        # A missed invalidation is drawn by the next check.
+        editor._dirty = True
+        time.sleep(.05)
+        assert len(redraws) > 1
+
+        # With an interval of 0, it doesn't wake up anymore.
+        editor._dirty = False
+        editor.refresh_interval = 0
+        time.sleep(.05)
+        count = len(redraws)
+        editor._dirty = True
+        time.sleep(.2)
+        assert len(redraws) == count
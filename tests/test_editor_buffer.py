@@ -0,0 +1,64 @@
+from __future__ import unicode_literals
+
+import time
+
+from pyvim.editor_buffer import EditorBuffer
+from pyvim.io import FileIO
+from pyvim.reporting import ReporterError
+
+
+class FakeEditor(object):
+    background_read_size = 0  # Read every file in the background.
+
+    def __init__(self):
+        self.io_backends = [FileIO()]
+        self.messages = []
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+    def call_in_loop(self, func, key=None):
+        func()
+
+
+def error(lineno, message):
+    return ReporterError(lineno, 0, 1, [('class:flakemessage', message)])
+
+
+def test_report_errors_by_line():
+    eb = EditorBuffer(FakeEditor(), text='a\nb\nc')
+    first, second, third = error(0, 'a'), error(2, 'b'), error(2, 'c')
+    eb.report_errors = [first, second, third]
+
+    assert eb.report_errors == [first, second, third]
+    assert eb.report_errors_at(0) == [first]
+    assert eb.report_errors_at(1) == []
+    assert eb.report_errors_at(2) == [second, third]
+
+    # Setting new errors replaces the index.
+    eb.report_errors = [error(1, 'd')]
+    assert eb.report_errors_at(0) == []
+    assert [e.lineno for e in eb.report_errors_at(1)] == [1]
+
+
+def test_failed_background_read(tmpdir, monkeypatch):
+    path = tmpdir.join('big.log')
+    path.write('first line\nsecond line\n')
+
+    def read(self, location, progress=None):
+        progress('first line\n', 11, 23)
+        raise IOError('disk error')
+    monkeypatch.setattr(FileIO, 'read', read)
+
+    editor = FakeEditor()
+    eb = EditorBuffer(editor, str(path))
+    deadline = time.time() + 5
+    while eb.loading and time.time() < deadline:
+        time.sleep(.01)
+
+    # The error stays visible, and the file can't be overwritten.
+    assert eb.read_failed and eb.buffer.read_only()
+    assert editor.messages[-1].startswith('Cannot read')
+    eb.write()
+    assert editor.messages[-1].startswith('Not written')
+    assert path.read() == 'first line\nsecond line\n'
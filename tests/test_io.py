@@ -0,0 +1,33 @@
+from __future__ import unicode_literals
+
+import pyvim.io.backends
+from pyvim.io import FileIO
+
+
+def test_read_normalizes_newlines(tmpdir, monkeypatch):
+    monkeypatch.setattr(pyvim.io.backends, 'SAMPLE_SIZE', 4)
+    monkeypatch.setattr(pyvim.io.backends, 'CHUNK_SIZE', 3)
+    path = tmpdir.join('a.v')
+    path.write_binary('abc\r\ndéf\r\n\rg'.encode('utf-8'))
+
+    progress = []
+    text, encoding = FileIO().read(str(path), lambda *a: progress.append(a))
+    assert (text, encoding) == ('abc\ndéf\n\rg', 'utf-8')
+    assert ''.join(p[0] for p in progress) == text
+    assert progress[-1][1:] == (13, 13)
+
+
+def test_read_falls_back_to_latin_1(tmpdir, monkeypatch):
+    monkeypatch.setattr(pyvim.io.backends, 'SAMPLE_SIZE', 4)
+    path = tmpdir.join('a.log')
+    path.write_binary(b'abcdef\xe9\r\n')
+
+    assert FileIO().read(str(path)) == ('abcdefé', 'latin-1')
+
+
+def test_read_drops_trailing_newline(tmpdir, monkeypatch):
+    monkeypatch.setattr(pyvim.io.backends, 'CHUNK_SIZE', 2)
+    path = tmpdir.join('a.v')
+    path.write_binary(b'a\r\nb\r\n')
+
+    assert FileIO().read(str(path)) == ('a\nb', 'utf-8')
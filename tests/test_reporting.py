@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import sys
+
+from prompt_toolkit.document import Document
+
+from pyvim.reporting import CommandChecker, ReportCache, ReportDispatcher, \
+    ReporterError, create_default_dispatcher, text_digest
+
+
+def test_dispatch_by_file_type():
+    dispatcher = create_default_dispatcher()
+    document = Document('import os\n')
+
+    errors = dispatcher.report('/src/a.py', document)
+    assert [(e.lineno, e.start_column, e.end_column) for e in errors] == [
+        (0, 0, 6)]
+    assert dispatcher.report('/src/a.txt', document) == []
+    assert dispatcher.checkers_for('/src/A.SV')
+    dispatcher.shutdown()
+
+
+def test_command_checker():
+    # A "lint tool" that reports line 2, column 6 of the file it receives.
+    script = ('import sys; open(sys.argv[1]).read(); '
+              'print("x.v:2:6: bad name")')
+    checker = CommandChecker(
+        'tool', [sys.executable, '-c', script, '{filename}'],
+        r':(?P<line>\d+):(?P<col>\d+): (?P<message>.*)')
+
+    errors = checker.check('/src/x.v', Document('a\nwire abc;\n'))
+    assert len(errors) == 1
+    assert (errors[0].lineno, errors[0].start_column,
+            errors[0].end_column) == (1, 5, 8)
+    assert errors[0].formatted_text[-1] == ('class:flakemessage', 'bad name')
+
+
+def test_missing_tool():
+    checker = CommandChecker('missing', ['pyvim-no-such-tool', '{filename}'],
+                             r':(?P<line>\d+):')
+    assert not checker.available
+    assert checker.check('/src/x.v', Document('a')) == []
+
+
+def test_text_digest():
+    assert text_digest('abc') == text_digest('abc')
+    assert text_digest('abc') != text_digest('abd')
+
+
+def test_report_cache_lru():
+    cache = ReportCache(max_entries=2)
+    cache.put('pyflakes', 'a', [])
+    cache.put('pyflakes', 'b', [])
+    assert cache.get('pyflakes', 'a') == []
+    cache.put('pyflakes', 'c', [])  # Evicts 'b', the least recently used.
+
+    assert cache.get('pyflakes', 'b') is None
+    assert cache.get('pyflakes', 'a') == []
+    assert cache.get('other', 'a') is None
+    assert len(cache) == 2
+
+
+def test_report_cache_persistence(tmpdir):
+    error = ReporterError(1, 2, 5, [('class:flakemessage', 'message')])
+    ReportCache(directory=str(tmpdir)).put('pyflakes', 'a', [error])
+
+    cached = ReportCache(directory=str(tmpdir)).get('pyflakes', 'a')
+    assert [e.to_tuple() for e in cached] == [error.to_tuple()]
+
+
+def test_dispatcher_uses_cache():
+    dispatcher = create_default_dispatcher()
+    document = Document('import os\n')
+    first = dispatcher.report('/src/a.py', document)
+    second = dispatcher.report('/src/b.py', document)
+    assert [e.to_tuple() for e in second] == [e.to_tuple() for e in first]
+    assert (dispatcher.cache.hits, dispatcher.cache.misses) == (1, 1)
+    dispatcher.shutdown()
+
+
+def test_process_pool():
+    dispatcher = create_default_dispatcher(processes=1)
+    dispatcher.warm_up()
+    errors = dispatcher.report('/src/a.py', Document('import os\n'))
+    assert [(e.lineno, e.start_column, e.end_column) for e in errors] == [
+        (0, 0, 6)]
+    assert dispatcher._process_pool is not None
+    dispatcher.shutdown()
+
+
+def test_command_checker_is_not_cached(tmpdir):
+    # A "lint tool" whose output depends on the directory of the buffer.
+    script = 'import sys; print("x.v:1:1: " + sys.argv[1])'
+    checker = CommandChecker('tool', [sys.executable, '-c', script,
+                                      '{directory}'],
+                             r':(?P<line>\d+):(?P<col>\d+): (?P<message>.*)')
+    dispatcher = ReportDispatcher(cache=ReportCache(directory=str(tmpdir)))
+    dispatcher.register(['.v'], checker)
+    document = Document('wire a;\n')
+
+    first = dispatcher.report('/src/a/x.v', document)
+    second = dispatcher.report('/src/b/x.v', document)
+    assert first[0].formatted_text[-1][1].endswith('a')
+    assert second[0].formatted_text[-1][1].endswith('b')
+    assert len(dispatcher.cache) == 0 and tmpdir.listdir() == []
+    dispatcher.shutdown()
@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from pyvim.fake_simulator import FakeSimulator
+from pyvim.simulator import SimulatorClient, TIMEOUT
+
+
+VALUES = {'TOP.a': 1, 'TOP.b': 2, 'TOP.c': 3}
+
+
+@pytest.fixture(params=[True, False], ids=['batch', 'per-handle'])
+def simulator(request):
+    sim = FakeSimulator(VALUES, batch=request.param).start()
+    yield sim
+    sim.stop()
+
+
+@pytest.fixture
+def client(simulator):
+    client = SimulatorClient('127.0.0.1', simulator.port)
+    client.detect_capabilities()
+    yield client
+    client.close()
+
+
+def test_capabilities(simulator, client):
+    assert client.supports_batch == simulator.batch
+
+
+def test_get_values_keeps_order(client):
+    handles = ['TOP.c', 'TOP.a', 'TOP.missing', 'TOP.b']
+    assert client.get_values(handles) == ['3', '1', None, '2']
+
+
+def test_batch_uses_one_request(simulator, client):
+    del simulator.requests[:]
+    client.get_values(sorted(VALUES))
+
+    if simulator.batch:
+        assert simulator.requests == [('POST', '/value/batch')]
+    else:
+        assert len(simulator.requests) == len(VALUES)
+
+
+def test_breakpoints(simulator, client):
+    del simulator.requests[:]
+    assert client.add_breakpoints([1, 2, 3]) == [1, 2, 3]
+    assert simulator.breakpoints == set([1, 2, 3])
+    assert client.remove_breakpoints([1, 3]) == [1, 3]
+    assert simulator.breakpoints == set([2])
+
+    if simulator.batch:
+        assert simulator.requests == [('POST', '/breakpoint/add'),
+                                      ('POST', '/breakpoint/remove')]
+    else:
+        assert len(simulator.requests) == 5
+
+
+def test_connections_are_reused(simulator, client):
+    for _ in range(5):
+        client.get_values(sorted(VALUES))
+    stats = client.stats()
+    assert 1 <= stats['connections'] <= client.max_workers
+    assert stats['reused'] == stats['requests'] - stats['connections']
+
+
+def test_unreachable_simulator():
+    client = SimulatorClient('127.0.0.1', 1, retries=0)
+    assert client.get_values(['TOP.a']) == [None]
+    assert client.stats()['errors'] == 1
+
+
+def test_concurrent_values_keep_order():
+    values = dict(('TOP.sig%i' % i, i) for i in range(50))
+    sim = FakeSimulator(values, batch=False, latency=.01).start()
+    try:
+        client = SimulatorClient('127.0.0.1', sim.port, max_workers=8)
+        handles = sorted(values, reverse=True)
+        assert client.get_values(handles) == [str(values[h]) for h in handles]
+        client.close()
+    finally:
+        sim.stop()
+
+
+def test_slow_value_times_out():
+    sim = FakeSimulator(VALUES, batch=False, latency=.5).start()
+    try:
+        client = SimulatorClient('127.0.0.1', sim.port, value_timeout=.1)
+        assert client.get_values(['TOP.a', 'TOP.b']) == [TIMEOUT, TIMEOUT]
+        assert client.stats()['timeouts'] == 2
+        client.close()
+    finally:
+        sim.stop()
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+from pyvim.value_history import ValueHistory
+
+
+HANDLES = ('TOP.a', 'TOP.b', 'TOP.c')
+
+
+def test_record_and_get():
+    history = ValueHistory()
+    assert history.record(1, HANDLES, ['1', '2', '3']) == 1
+    assert history.record(1, HANDLES, ['1', '5', '']) == 2
+    assert history.record(2, HANDLES, ['7', '8', '9']) == 1
+
+    assert history.get(1, 1) == ['1', '2', '3']
+    assert history.get(1, 2) == ['1', '5', '']
+    assert history.get(1, 3) is None
+    assert history.hits(1) == [1, 2]
+    assert history.hit_count(2) == 1
+
+
+def test_update_unknown_values():
+    history = ValueHistory()
+    hit = history.record(1, HANDLES, [None, None, None])
+    history.update(1, hit, [2, 0], ['c', 'a'])
+    assert history.get(1, hit) == ['a', None, 'c']
+
+
+def test_diff():
+    history = ValueHistory()
+    history.record(1, HANDLES, ['1', '2', '3'])
+    history.record(1, HANDLES, ['1', '5', '6'])
+    assert history.diff(1, 1, 2) == [(1, '2', '5'), (2, '3', '6')]
+    assert history.diff(1, 1, 4) is None
+
+
+def test_eviction():
+    history = ValueHistory(max_entries=3)
+    for i in range(5):
+        history.record(1, HANDLES, [str(i)] * 3)
+
+    assert history.hits(1) == [3, 4, 5]
+    assert history.evicted == 2
+
+    history = ValueHistory(max_size=100)
+    for i in range(10):
+        history.record(i, HANDLES, ['x' * 20] * 3)
+    assert history.size <= 100
+    assert len(history) < 10
@@ -0,0 +1,71 @@
+from __future__ import unicode_literals
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from pyvim.watcher import WatcherModel
+
+
+@pytest.fixture
+def model(qt_app):
+    model = WatcherModel()
+    model.set_rows(1, ('a', 'b9', 'b10', 'c'), ['10', '9', None, 'x'], [1])
+    return model
+
+
+def column(model, col):
+    return [model.data(model.index(row, col)) for row in range(model.rowCount())]
+
+
+def test_set_rows(model):
+    assert model.rowCount() == 4
+    assert column(model, 0) == ['a', 'b9', 'b10', 'c']
+    assert column(model, 1) == ['10', '9', model.placeholder, 'x']
+    assert model.data(model.index(1, 1), Qt.BackgroundRole) is not None
+    assert model.data(model.index(0, 1), Qt.BackgroundRole) is None
+
+
+def test_update_changed(model):
+    updated = []
+    model.rows_updated.connect(updated.append)
+    model.update_changed(2, [(3, 'y')])
+
+    assert model.generation == 2 and updated == [2]
+    assert column(model, 1)[3] == 'y'
+    assert [model.data(model.index(row, 1), Qt.BackgroundRole) is not None
+            for row in range(4)] == [False, False, False, True]
+
+
+def test_set_values_drops_stale_generations(model):
+    model.set_values(0, [(2, '3', False)])
+    assert model._values[2] is None
+
+    model.set_values(1, [(2, '3', True)])
+    assert column(model, 1)[2] == '3'
+
+
+def test_filter_and_sort(model):
+    model.set_filter('b')
+    assert column(model, 0) == ['b9', 'b10']
+
+    # Visible rows map to the source rows.
+    model.sort(0, Qt.DescendingOrder)
+    assert column(model, 0) == ['b9', 'b10']
+    model.fetch_rows([0, 1])
+    assert list(model._requested) == [0, 0, 1, 0]
+
+    model.set_values(1, [(2, '3', False)])
+    model.sort(1, Qt.AscendingOrder)
+    assert column(model, 0) == ['b10', 'b9']
+
+    model.set_filter('')
+    assert column(model, 0) == ['b10', 'b9', 'a', 'c']
+
+
+def test_sort_by_value(model):
+    # Numbers sort by value, before text. Values that are not fetched yet
+    # stay at the end in both orders.
+    model.sort(1, Qt.AscendingOrder)
+    assert column(model, 0) == ['b9', 'a', 'c', 'b10']
+    model.sort(1, Qt.DescendingOrder)
+    assert column(model, 0) == ['c', 'a', 'b9', 'b10']